@@ -1,8 +1,11 @@
+import contextlib
+import functools
+import json
 import logging
+import os
 from typing import Optional, Any
 from urllib.parse import quote
 
-import aiohttp
 import asyncio
 from dotenv import load_dotenv
 from livekit.agents import (
@@ -12,23 +15,62 @@ from livekit.agents import (
     JobContext,
     JobProcess,
     RunContext,
-    ToolError,
     cli,
     function_tool,
     inference,
-    utils,
     room_io,
 )
 from livekit import rtc
 from livekit.plugins import noise_cancellation, silero
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
+from faq_cache import FAQAnswerCache
+from faq_index import SharedFAQIndex
+from lead_spool import LeadSpool, PermanentError
+from tool_http import Endpoint, HTTPStatusError, ToolDispatcher
+from warmup import FirstTurnProbe, StepTimings, warm_job, warm_vad
+
 logger = logging.getLogger("agent-sales_manager")
 
 load_dotenv(".env.local")
 
+# Local FAQ index: answered in-process when confident, otherwise the remote faq_search endpoint
+FAQ_INDEX_PATH = os.getenv("FAQ_INDEX_PATH", "faq.json")
+FAQ_INDEX_URL = os.getenv("FAQ_INDEX_URL")
+FAQ_MIN_CONFIDENCE = float(os.getenv("FAQ_MIN_CONFIDENCE", "0.6"))
+FAQ_RELOAD_INTERVAL = float(os.getenv("FAQ_RELOAD_INTERVAL", "300"))
+# Answers shared by every session in the worker process, keyed by the normalized question
+FAQ_CACHE_SIZE = int(os.getenv("FAQ_CACHE_SIZE", "1024"))
+FAQ_CACHE_TTL = float(os.getenv("FAQ_CACHE_TTL", "3600"))
+# save_lead / save_summary are written to this spool and sent to the CRM in the background
+LEAD_SPOOL_PATH = os.getenv("LEAD_SPOOL_PATH", "lead_spool.sqlite3")
+LEAD_SPOOL_DRAIN_TIMEOUT = float(os.getenv("LEAD_SPOOL_DRAIN_TIMEOUT", "10"))
+
+# Tool backend; each endpoint's budget bounds the whole call, retries and hedges included
+TOOL_API_URL = os.getenv(
+    "TOOL_API_URL", "https://salesforce-faq-server-5mfb9qxso-tg73084-9847s-projects.vercel.app/api"
+).rstrip("/")
+TOOL_ENDPOINTS = [
+    # Read-only lookup spoken mid-turn: tight budget, hedge a slow request
+    Endpoint("faq_search", f"{TOOL_API_URL}/faq-search", budget=4.0, retries=1, hedge_after=1.0),
+    # Writes are not retried here; the lead spool retries them in the background
+    Endpoint("save_lead", f"{TOOL_API_URL}/save-lead", budget=10.0),
+    Endpoint("save_summary", f"{TOOL_API_URL}/save-summary", budget=10.0),
+    Endpoint("murf_tts", f"{TOOL_API_URL}/murf", budget=8.0, retries=1),
+]
+
 class DefaultAgent(Agent):
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        faq_index: Optional[SharedFAQIndex] = None,
+        faq_cache: Optional[FAQAnswerCache] = None,
+        lead_spool: Optional[LeadSpool] = None,
+        tools: Optional[ToolDispatcher] = None,
+    ) -> None:
+        self._faq_index = faq_index
+        self._faq_cache = faq_cache
+        self._lead_spool = lead_spool
+        self._tools = tools or ToolDispatcher(TOOL_ENDPOINTS)
         super().__init__(
             instructions="""You are Rahul, a warm, professional, and knowledgeable Sales Development Representative (SDR) for Salesforce. You speak clearly, confidently, and concisely.
 
@@ -245,28 +287,23 @@ Never fabricate information or assumptions.""",
             query: 
         """
 
-        context.disallow_interruptions()
+        if self._faq_cache is not None:
+            cached = self._faq_cache.get(query)
+            if cached is not None:
+                return cached
 
-        url = "https://salesforce-faq-server-5mfb9qxso-tg73084-9847s-projects.vercel.app/api/faq-search"
-        headers = {
-            "Content-Type": "application/json",
-        }
-        payload = {
-            "query": query,
-        }
+        if self._faq_index is not None:
+            match = self._faq_index.lookup(query)
+            if match is not None:
+                logger.debug("faq_search answered locally: %s (confidence %.2f)", match.id, match.confidence)
+                return match.to_json()
+
+        context.disallow_interruptions()
 
-        try:
-            session = utils.http_context.http_session()
-            timeout = aiohttp.ClientTimeout(total=10)
-            async with session.post(url, timeout=timeout, headers=headers, json=payload) as resp:
-                body = await resp.text()
-                if resp.status >= 400:
-                    raise ToolError(f"error: HTTP {resp.status}: {body}")
-                return body
-        except ToolError:
-            raise
-        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-            raise ToolError(f"error: {e!s}") from e
+        body = await self._tools.call("faq_search", {"query": query})
+        if self._faq_cache is not None:
+            self._faq_cache.put(query, body)
+        return body
 
     @function_tool(name="save_lead")
     async def _http_tool_save_lead(
@@ -288,10 +325,6 @@ Never fabricate information or assumptions.""",
 
         context.disallow_interruptions()
 
-        url = "https://salesforce-faq-server-5mfb9qxso-tg73084-9847s-projects.vercel.app/api/save-lead"
-        headers = {
-            "Content-Type": "application/json",
-        }
         payload = {
             "name": name,
             "email": email,
@@ -302,19 +335,7 @@ Never fabricate information or assumptions.""",
             "timeline": timeline,
             "matched_faq_ids": matched_faq_ids,
         }
-
-        try:
-            session = utils.http_context.http_session()
-            timeout = aiohttp.ClientTimeout(total=10)
-            async with session.post(url, timeout=timeout, headers=headers, json=payload) as resp:
-                body = await resp.text()
-                if resp.status >= 400:
-                    raise ToolError(f"error: HTTP {resp.status}: {body}")
-                return body
-        except ToolError:
-            raise
-        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-            raise ToolError(f"error: {e!s}") from e
+        return await self._save("save_lead", payload)
 
     @function_tool(name="save_summary")
     async def _http_tool_save_summary(
@@ -330,27 +351,11 @@ Never fabricate information or assumptions.""",
 
         context.disallow_interruptions()
 
-        url = "https://salesforce-faq-server-5mfb9qxso-tg73084-9847s-projects.vercel.app/api/save-summary"
-        headers = {
-            "Content-Type": "application/json",
-        }
         payload = {
             "summary": summary,
             "lead": lead,
         }
-
-        try:
-            session = utils.http_context.http_session()
-            timeout = aiohttp.ClientTimeout(total=10)
-            async with session.post(url, timeout=timeout, headers=headers, json=payload) as resp:
-                body = await resp.text()
-                if resp.status >= 400:
-                    raise ToolError(f"error: HTTP {resp.status}: {body}")
-                return body
-        except ToolError:
-            raise
-        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-            raise ToolError(f"error: {e!s}") from e
+        return await self._save("save_summary", payload)
 
     @function_tool(name="murf_tts")
     async def _http_tool_murf_tts(
@@ -367,39 +372,104 @@ Never fabricate information or assumptions.""",
 
         context.disallow_interruptions()
 
-        url = "https://salesforce-faq-server-5mfb9qxso-tg73084-9847s-projects.vercel.app/api/murf"
-        headers = {
-            "Content-Type": "application/json",
-        }
         payload = {
             "text": text,
             "voice": voice,
             "format": format_,
         }
+        return await self._tools.call("murf_tts", payload)
+
+    async def _save(self, endpoint: str, payload: dict) -> str:
+        """CRM writes go to the spool when there is one, otherwise straight to the backend"""
+        if self._lead_spool is None:
+            return await self._tools.call(endpoint, payload)
+        url = self._tools.endpoints[endpoint].url
+        spool_id = await asyncio.to_thread(self._lead_spool.enqueue, url, payload)
+        self._lead_spool.notify()
+        return json.dumps({"status": "queued", "id": spool_id})
+
 
-        try:
-            session = utils.http_context.http_session()
-            timeout = aiohttp.ClientTimeout(total=10)
-            async with session.post(url, timeout=timeout, headers=headers, json=payload) as resp:
-                body = await resp.text()
-                if resp.status >= 400:
-                    raise ToolError(f"error: HTTP {resp.status}: {body}")
-                return body
-        except ToolError:
-            raise
-        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
-            raise ToolError(f"error: {e!s}") from e
+async def send_spooled(tools: ToolDispatcher, url: str, payload: dict) -> None:
+    """Deliver one spooled CRM write; 4xx answers other than 408/429 are not retried"""
+    try:
+        await tools.request(tools.endpoint_for(url), payload)
+    except HTTPStatusError as e:
+        if not e.retryable:
+            raise PermanentError(str(e)) from e
+        raise
 
 
 server = AgentServer()
 
 def prewarm(proc: JobProcess):
-    proc.userdata["vad"] = silero.VAD.load()
+    timings = StepTimings()
+    with timings.step("vad_load", required=True):
+        proc.userdata["vad"] = silero.VAD.load()
+    with timings.step("vad_inference"):
+        warm_vad(proc.userdata["vad"])
+    with timings.step("faq_index"):
+        faq_index = SharedFAQIndex(
+            path=FAQ_INDEX_PATH,
+            url=FAQ_INDEX_URL,
+            min_confidence=FAQ_MIN_CONFIDENCE,
+            reload_interval=FAQ_RELOAD_INTERVAL,
+        )
+        faq_index.load()
+        faq_index.start()
+        proc.userdata["faq_index"] = faq_index
+    proc.userdata["faq_cache"] = FAQAnswerCache(max_entries=FAQ_CACHE_SIZE, ttl=FAQ_CACHE_TTL)
+    with timings.step("lead_spool"):
+        proc.userdata["lead_spool"] = LeadSpool(LEAD_SPOOL_PATH)
+    # Circuit breakers and latency stats are shared by every job in the process
+    proc.userdata["tools"] = ToolDispatcher(TOOL_ENDPOINTS)
+
+    proc.userdata["prewarm"] = timings
+    logger.info("prewarm finished: %s", timings.summary())
 
 server.setup_fnc = prewarm
 
 @server.rtc_session(agent_name="sales_manager")
 async def entrypoint(ctx: JobContext):
+    first_turn = FirstTurnProbe()
+    faq_index = ctx.proc.userdata.get("faq_index")
+    faq_cache = ctx.proc.userdata.get("faq_cache")
+    lead_spool = ctx.proc.userdata.get("lead_spool")
+    tools = ctx.proc.userdata.get("tools") or ToolDispatcher(TOOL_ENDPOINTS)
+    tools.acquire()
+    send = functools.partial(send_spooled, tools)
+    flusher = asyncio.create_task(lead_spool.run(send)) if lead_spool is not None else None
+
+    # Warm the turn detector and the tool connections while the session joins the room
+    turn_detector = MultilingualModel()
+    job_warmup = StepTimings()
+    warmup = asyncio.create_task(warm_job(job_warmup, turn_detector, tools))
+
+    async def on_shutdown():
+        warmup.cancel()
+        if flusher is not None:
+            flusher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await flusher
+            # Whatever the CRM doesn't take now stays on disk for the next job
+            await lead_spool.drain(send, LEAD_SPOOL_DRAIN_TIMEOUT)
+        # Counters are per worker process, so they cover every job it has run so far
+        logger.info(
+            "faq stats: index=%s cache=%s",
+            faq_index.stats if faq_index is not None else None,
+            faq_cache.stats() if faq_cache is not None else None,
+        )
+        logger.info("tool stats: %s", tools.stats())
+        prewarm = ctx.proc.userdata.get("prewarm")
+        logger.info(
+            "cold start: prewarm=%s job_warmup=%s first_turn=%s",
+            prewarm.summary() if prewarm is not None else None,
+            job_warmup.summary(),
+            first_turn.summary(),
+        )
+        await tools.release()
+
+    ctx.add_shutdown_callback(on_shutdown)
+
     session = AgentSession(
         stt=inference.STT(model="assemblyai/universal-streaming", language="en"),
         llm=inference.LLM(model="openai/gpt-4.1-mini"),
@@ -408,13 +478,14 @@ async def entrypoint(ctx: JobContext):
             voice="a167e0f3-df7e-4d52-a9c3-f949145efdab",
             language="en-US"
         ),
-        turn_detection=MultilingualModel(),
+        turn_detection=turn_detector,
         vad=ctx.proc.userdata["vad"],
         preemptive_generation=True,
     )
+    first_turn.attach(session)
 
     await session.start(
-        agent=DefaultAgent(),
+        agent=DefaultAgent(faq_index=faq_index, faq_cache=faq_cache, lead_spool=lead_spool, tools=tools),
         room=ctx.room,
         room_options=room_io.RoomOptions(
             audio_input=room_io.AudioInputOptions(
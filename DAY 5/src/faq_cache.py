@@ -0,0 +1,66 @@
+"""Worker-process-wide cache of ``faq_search`` answers.
+
+Callers ask the same few questions in many different words, so answers are
+keyed by the normalized query (see ``faq_index.normalize_terms``): "What's the
+pricing?" and "what is pricing" share one entry. Entries expire after a TTL so
+FAQ edits on the server show up, and the least recently used entry is dropped
+once the cache is full.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from faq_index import normalize_terms
+
+
+def query_key(query: str) -> Optional[str]:
+    """Order-insensitive key of the query's meaningful words, or None if it has none"""
+    terms = sorted(set(normalize_terms(query)))
+    return " ".join(terms) or None
+
+
+class FAQAnswerCache:
+    """Bounded LRU of answers with a time-to-live, safe to share between jobs"""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+    def get(self, query: str) -> Optional[str]:
+        key = query_key(query)
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                self._counters["expired"] += 1
+                entry = None
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry[1]
+
+    def put(self, query: str, answer: str) -> None:
+        key = query_key(query)
+        if key is None or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters, entries=len(self._entries))
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
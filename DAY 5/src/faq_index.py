@@ -0,0 +1,266 @@
+"""In-process FAQ search for the ``faq_search`` tool.
+
+The FAQ corpus is loaded once per worker process (in ``prewarm``) into a BM25
+term-weight matrix, so a lookup is a few NumPy column sums instead of an HTTP
+round-trip. Matches below the confidence threshold are not answered locally and
+the tool falls back to the remote search endpoint.
+
+``SharedFAQIndex`` re-reads the source on a background thread and swaps a
+freshly built index in with a single assignment, so lookups from active calls
+never wait on a reload.
+"""
+import hashlib
+import json
+import logging
+import math
+import re
+import threading
+import time
+import urllib.request
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger("faq-index")
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Words that carry no meaning for FAQ matching ("what is the price" ~ "price")
+STOP_WORDS = frozenset(
+    {
+        "a", "about", "an", "and", "any", "are", "as", "at", "be", "can", "could", "do",
+        "does", "for", "from", "have", "has", "how", "i", "if", "in", "is", "it", "its",
+        "many", "me", "much", "my", "of", "on", "or", "our", "please", "s", "so", "some",
+        "t", "tell", "that", "the", "there", "this", "to", "us", "was", "we", "what",
+        "when", "where", "which", "who", "why", "will", "with", "would", "you", "your",
+    }
+)
+
+# (suffix, replacement) tried in order; "integrates", "integrated" and
+# "integration" all reduce to "integrat", "pricing" and "prices" to "pric"
+_SUFFIXES = (
+    ("ations", "at"),
+    ("ation", "at"),
+    ("ies", "y"),
+    ("ied", "y"),
+    ("ing", ""),
+    ("ed", ""),
+    ("es", ""),
+    ("ly", ""),
+    ("s", ""),
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def stem(word: str) -> str:
+    """Light suffix-stripping stemmer; good enough to merge plurals and verb forms"""
+    for suffix, replacement in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            if suffix == "s" and word.endswith("ss"):
+                break
+            word = word[: -len(suffix)] + replacement
+            break
+    if word.endswith("e") and len(word) > 4:
+        word = word[:-1]
+    return word
+
+
+def normalize_terms(text: str) -> list[str]:
+    """Lowercased, stemmed words of ``text`` without punctuation or stop words"""
+    return [stem(word) for word in tokenize(text) if word not in STOP_WORDS]
+
+
+@dataclass
+class FAQMatch:
+    id: str
+    question: str
+    answer: str
+    score: float
+    confidence: float
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "id": self.id,
+                "question": self.question,
+                "answer": self.answer,
+                "confidence": round(self.confidence, 3),
+                "source": "local",
+            }
+        )
+
+
+def parse_entries(data: Any) -> list[dict]:
+    """FAQ entries from a list (or ``{"faqs": [...]}``) of ``{id, question, answer}`` objects"""
+    if isinstance(data, dict):
+        data = data.get("faqs", [])
+    if not isinstance(data, list):
+        raise ValueError("FAQ source must be a list of entries or an object with a 'faqs' list")
+    entries = []
+    for number, item in enumerate(data, 1):
+        if not isinstance(item, dict):
+            raise ValueError(f"FAQ entry {number} is not an object")
+        if not item.get("question") or not item.get("answer"):
+            raise ValueError(f"FAQ entry {number} needs both 'question' and 'answer'")
+        entries.append(
+            {
+                "id": str(item.get("id") or number),
+                "question": item["question"],
+                "answer": item["answer"],
+            }
+        )
+    return entries
+
+
+class FAQIndex:
+    """Okapi BM25 over FAQ questions and answers, as a dense documents x terms matrix.
+
+    FAQ corpora are small (hundreds of entries), so the dense matrix stays a few
+    megabytes and scoring a query is a column gather plus a row sum.
+    """
+
+    def __init__(self, entries: list[dict], k1: float = 1.5, b: float = 0.75) -> None:
+        self.entries = entries
+        # Questions count twice: callers phrase things like the question, not the answer
+        docs = [normalize_terms(f"{e['question']} {e['question']} {e['answer']}") for e in entries]
+        self.vocab: dict[str, int] = {}
+        for doc in docs:
+            for term in doc:
+                self.vocab.setdefault(term, len(self.vocab))
+
+        tf = np.zeros((len(docs), len(self.vocab)), dtype=np.float32)
+        for row, doc in enumerate(docs):
+            for term in doc:
+                tf[row, self.vocab[term]] += 1
+
+        n = len(docs)
+        df = (tf > 0).sum(axis=0)
+        self.idf = np.log(1 + (n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        # A query term no FAQ contains is as informative as the rarest possible term
+        self.unknown_idf = math.log(1 + (n + 0.5) / 0.5)
+        lengths = tf.sum(axis=1)
+        average = float(lengths.mean()) if n else 1.0
+        norm = k1 * (1 - b + b * lengths / max(average, 1.0))
+        self.weights = tf * (k1 + 1) / (tf + norm[:, None]) * self.idf
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def search(self, query: str, limit: int = 1) -> list[FAQMatch]:
+        """Best matches for ``query``, highest score first.
+
+        ``confidence`` is the IDF-weighted share of the query's terms that the
+        FAQ contains: 1.0 when every informative word of the question appears.
+        """
+        terms = list(dict.fromkeys(normalize_terms(query)))
+        if not terms or not self.entries:
+            return []
+        columns = [self.vocab[term] for term in terms if term in self.vocab]
+        if not columns:
+            return []
+        total_idf = float(self.idf[columns].sum()) + self.unknown_idf * (len(terms) - len(columns))
+
+        scores = self.weights[:, columns].sum(axis=1)
+        matches = []
+        for row in np.argsort(-scores)[:limit]:
+            if scores[row] <= 0:
+                break
+            present = self.weights[row, columns] > 0
+            entry = self.entries[row]
+            matches.append(
+                FAQMatch(
+                    id=entry["id"],
+                    question=entry["question"],
+                    answer=entry["answer"],
+                    score=float(scores[row]),
+                    confidence=float(self.idf[columns][present].sum()) / total_idf,
+                )
+            )
+        return matches
+
+
+class SharedFAQIndex:
+    """The worker process's FAQ index, reloaded from a file or URL in the background"""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        url: Optional[str] = None,
+        min_confidence: float = 0.6,
+        reload_interval: float = 300.0,
+    ) -> None:
+        self.path = path
+        self.url = url
+        self.min_confidence = min_confidence
+        self.reload_interval = reload_interval
+        self.index = FAQIndex([])
+        self.stats = {"lookups": 0, "local_hits": 0, "fallbacks": 0, "reloads": 0}
+        self._digest: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _read_source(self) -> Optional[bytes]:
+        if self.url:
+            with urllib.request.urlopen(self.url, timeout=10) as resp:
+                return resp.read()
+        if self.path:
+            try:
+                with open(self.path, "rb") as f:
+                    return f.read()
+            except FileNotFoundError:
+                return None
+        return None
+
+    def load(self) -> bool:
+        """Rebuild the index if the source changed; returns True when a new index was swapped in"""
+        started = time.perf_counter()
+        try:
+            raw = self._read_source()
+            if raw is None:
+                return False
+            digest = hashlib.sha256(raw).hexdigest()
+            if digest == self._digest:
+                return False
+            index = FAQIndex(parse_entries(json.loads(raw)))
+        except (OSError, ValueError) as e:
+            # Keep serving the previous index; the remote endpoint still covers misses
+            logger.warning("FAQ index reload failed: %s", e)
+            return False
+        self.index = index
+        self._digest = digest
+        self.stats["reloads"] += 1
+        logger.info(
+            "loaded %d FAQs (%d terms) in %.1f ms",
+            len(index),
+            len(index.vocab),
+            (time.perf_counter() - started) * 1000,
+        )
+        return True
+
+    def lookup(self, query: str) -> Optional[FAQMatch]:
+        """The confident local answer for ``query``, or None to fall back to the remote search"""
+        self.stats["lookups"] += 1
+        matches = self.index.search(query)
+        if matches and matches[0].confidence >= self.min_confidence:
+            self.stats["local_hits"] += 1
+            return matches[0]
+        self.stats["fallbacks"] += 1
+        return None
+
+    def start(self) -> None:
+        """Reload every ``reload_interval`` seconds on a daemon thread"""
+        if self._thread is not None or self.reload_interval <= 0:
+            return
+        self._thread = threading.Thread(target=self._reload_loop, name="faq-index-reload", daemon=True)
+        self._thread.start()
+
+    def _reload_loop(self) -> None:
+        while not self._stop.wait(self.reload_interval):
+            self.load()
+
+    def close(self) -> None:
+        self._stop.set()
@@ -0,0 +1,196 @@
+"""Durable write-behind spool for the CRM writes (``save_lead`` / ``save_summary``).
+
+The tools append the request to a local SQLite table and return at once; a
+background flusher posts spooled records to the backend in batches, retrying
+failures with exponential backoff and jitter. Records stay on disk until the
+backend accepts them, so a slow or unavailable CRM never holds a caller in
+dead air and never loses a lead: whatever is left at shutdown is sent by the
+next job to start.
+
+Delivery is at least once. Several worker processes may share one spool file;
+a record is leased to one flusher at a time so they don't send it twice while
+it is in flight.
+"""
+import asyncio
+import contextlib
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from collections.abc import Awaitable
+from typing import Any, Callable
+
+logger = logging.getLogger("lead-spool")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS spool (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    leased_until REAL NOT NULL DEFAULT 0,
+    dead INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT
+)
+"""
+
+
+class PermanentError(Exception):
+    """The backend rejected the record; sending the same payload again cannot succeed"""
+
+
+Sender = Callable[[str, dict], Awaitable[Any]]
+
+
+class LeadSpool:
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 20,
+        lease: float = 60.0,
+        base_backoff: float = 1.0,
+        max_backoff: float = 300.0,
+        poll_interval: float = 2.0,
+    ) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.lease = lease
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self.stats = {"enqueued": 0, "sent": 0, "retries": 0, "dead": 0}
+        self._lock = threading.Lock()
+        # One wake-up event per running flusher; concurrent jobs each run their own
+        self._wakeups: dict[asyncio.Event, asyncio.AbstractEventLoop] = {}
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            # A lead acknowledged to the caller must survive a crash
+            self._db.execute("PRAGMA synchronous=FULL")
+            self._db.execute(_SCHEMA)
+
+    def enqueue(self, url: str, payload: dict) -> int:
+        """Persist one request; returns its spool id. Blocks on the disk write, so run it in a thread"""
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO spool (url, payload, created) VALUES (?, ?, ?)",
+                (url, json.dumps(payload), time.time()),
+            )
+        self.stats["enqueued"] += 1
+        return cursor.lastrowid
+
+    def notify(self) -> None:
+        """Wake every running flusher; call after ``enqueue``"""
+        for wakeup, loop in list(self._wakeups.items()):
+            loop.call_soon_threadsafe(wakeup.set)
+
+    def pending(self) -> int:
+        """Records not yet accepted by the backend (excluding rejected ones)"""
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM spool WHERE dead = 0").fetchone()[0]
+
+    def _claim(self, ignore_backoff: bool = False, after_id: int = 0) -> list[tuple[int, str, str, int]]:
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    "SELECT id, url, payload, attempts FROM spool"
+                    " WHERE dead = 0 AND id > ? AND leased_until <= ? AND (next_attempt <= ? OR ?)"
+                    " ORDER BY id LIMIT ?",
+                    (after_id, now, now, ignore_backoff, self.batch_size),
+                ).fetchall()
+                self._db.executemany(
+                    "UPDATE spool SET leased_until = ? WHERE id = ?",
+                    [(now + self.lease, row[0]) for row in rows],
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return rows
+
+    def _sent(self, record_id: int) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM spool WHERE id = ?", (record_id,))
+        self.stats["sent"] += 1
+
+    def _release(self, record_ids: list[int]) -> None:
+        with self._lock:
+            self._db.executemany("UPDATE spool SET leased_until = 0 WHERE id = ?", [(i,) for i in record_ids])
+
+    def _failed(self, record_id: int, attempts: int, error: Exception) -> None:
+        if isinstance(error, PermanentError):
+            # Kept on disk for inspection, but never retried
+            with self._lock:
+                self._db.execute(
+                    "UPDATE spool SET dead = 1, attempts = ?, leased_until = 0, last_error = ? WHERE id = ?",
+                    (attempts + 1, str(error), record_id),
+                )
+            self.stats["dead"] += 1
+            logger.error("spooled record %d rejected by the backend: %s", record_id, error)
+            return
+        delay = min(self.max_backoff, self.base_backoff * 2**attempts) * random.uniform(0.5, 1.5)
+        with self._lock:
+            self._db.execute(
+                "UPDATE spool SET attempts = ?, next_attempt = ?, leased_until = 0, last_error = ? WHERE id = ?",
+                (attempts + 1, time.time() + delay, str(error), record_id),
+            )
+        self.stats["retries"] += 1
+        logger.warning("spooled record %d failed (attempt %d), retrying in %.1fs: %s", record_id, attempts + 1, delay, error)
+
+    async def _send(self, rows: list[tuple[int, str, str, int]], send: Sender) -> None:
+        # Every bookkeeping write is a committed, fsynced transaction: keep them off the event loop
+        for index, (record_id, url, payload, attempts) in enumerate(rows):
+            try:
+                await send(url, json.loads(payload))
+            except asyncio.CancelledError:
+                # Hand the rest of the batch back instead of waiting out the lease
+                await asyncio.to_thread(self._release, [row[0] for row in rows[index:]])
+                raise
+            except Exception as e:
+                await asyncio.to_thread(self._failed, record_id, attempts, e)
+            else:
+                await asyncio.to_thread(self._sent, record_id)
+
+    async def flush(self, send: Sender) -> int:
+        """Send one batch of due records; returns how many were claimed"""
+        rows = await asyncio.to_thread(self._claim)
+        await self._send(rows, send)
+        return len(rows)
+
+    async def run(self, send: Sender) -> None:
+        """Flush continuously until cancelled"""
+        wakeup = asyncio.Event()
+        self._wakeups[wakeup] = asyncio.get_running_loop()
+        try:
+            while True:
+                if await self.flush(send) == self.batch_size:
+                    continue
+                wakeup.clear()
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(wakeup.wait(), self.poll_interval)
+        finally:
+            del self._wakeups[wakeup]
+
+    async def drain(self, send: Sender, timeout: float) -> int:
+        """Try every pending record once now, ignoring backoff; returns how many are still pending"""
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._drain(send), timeout)
+        remaining = await asyncio.to_thread(self.pending)
+        if remaining:
+            logger.warning("%d spooled records left for the next job to send", remaining)
+        return remaining
+
+    async def _drain(self, send: Sender) -> None:
+        last_id = 0
+        while True:
+            rows = await asyncio.to_thread(self._claim, True, last_id)
+            if not rows:
+                return
+            await self._send(rows, send)
+            last_id = rows[-1][0]
@@ -0,0 +1,295 @@
+"""Shared HTTP dispatcher for the agent's function tools.
+
+Every tool call goes through ``ToolDispatcher.call``, which gives each backend
+endpoint:
+
+* a latency budget: the whole call, retries included, finishes or fails within it;
+* retries with full-jitter exponential backoff for transport errors, 5xx and 429;
+* optional hedging for idempotent lookups: if the first request is slower than
+  ``hedge_after``, a second one races it and the first answer wins;
+* a circuit breaker, so an endpoint that keeps failing is refused immediately
+  instead of stalling every session for its full budget;
+* latency percentiles and error counters, logged when a job ends.
+
+Breakers and counters are shared by every job in the worker process. Each event
+loop gets its own pooled ``aiohttp`` session with keep-alive, DNS caching and
+connection limits. Jobs ``acquire`` it when they start and ``release`` it when
+they end, and it is closed only once the last job on that loop has released it.
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+import aiohttp
+from livekit.agents import ToolError
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    name: str
+    url: str
+    budget: float = 10.0
+    retries: int = 0
+    backoff: float = 0.2
+    hedge_after: Optional[float] = None
+
+
+class HTTPStatusError(ToolError):
+    """The endpoint answered with an HTTP error status"""
+
+    def __init__(self, status: int, body: str) -> None:
+        super().__init__(f"error: HTTP {status}: {body}")
+        self.status = status
+
+    @property
+    def retryable(self) -> bool:
+        return self.status >= 500 or self.status in (408, 429)
+
+
+class CircuitOpenError(ToolError):
+    """The endpoint failed repeatedly and is being skipped until it cools down"""
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures; lets one probe through after ``reset_timeout``"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._probing or time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def abandon(self) -> None:
+        """The call was cancelled before it could tell whether the endpoint recovered"""
+        with self._lock:
+            self._probing = False
+
+
+def _quantile(ordered: list[float], q: float) -> Optional[float]:
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class EndpointStats:
+    def __init__(self, window: int = 512) -> None:
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.counters = {"calls": 0, "errors": 0, "retries": 0, "hedges": 0, "rejected": 0}
+        self._lock = threading.Lock()
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def observe(self, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            self.latencies.append(seconds)
+            self.counters["calls"] += 1
+            if error:
+                self.counters["errors"] += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            ordered = sorted(self.latencies)
+            summary = dict(self.counters)
+        for label, q in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            value = _quantile(ordered, q)
+            summary[label] = round(value * 1000, 1) if value is not None else None
+        return summary
+
+
+class ToolDispatcher:
+    def __init__(
+        self,
+        endpoints: list[Endpoint],
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        connection_limit: int = 100,
+        connections_per_host: int = 20,
+        keepalive_timeout: float = 60.0,
+        dns_cache_ttl: int = 300,
+    ) -> None:
+        self.endpoints = {endpoint.name: endpoint for endpoint in endpoints}
+        self._by_url = {endpoint.url: endpoint for endpoint in endpoints}
+        self._breakers = {
+            endpoint.name: CircuitBreaker(failure_threshold, reset_timeout) for endpoint in endpoints
+        }
+        self._stats = {endpoint.name: EndpointStats() for endpoint in endpoints}
+        self.connection_limit = connection_limit
+        self.connections_per_host = connections_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self._sessions: dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+        self._users: dict[asyncio.AbstractEventLoop, int] = {}
+
+    def session(self) -> aiohttp.ClientSession:
+        """Pooled session for the running event loop, created on first use"""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit,
+                limit_per_host=self.connections_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+                enable_cleanup_closed=True,
+            )
+            session = self._sessions[loop] = aiohttp.ClientSession(connector=connector)
+        return session
+
+    def acquire(self) -> None:
+        """Register a job that uses the running loop's session; pair with ``release``"""
+        loop = asyncio.get_running_loop()
+        self._users[loop] = self._users.get(loop, 0) + 1
+
+    async def release(self) -> None:
+        """A job on the running loop is done; the last one out closes the loop's session"""
+        loop = asyncio.get_running_loop()
+        users = self._users.get(loop, 0) - 1
+        if users > 0:
+            self._users[loop] = users
+            return
+        self._users.pop(loop, None)
+        session = self._sessions.pop(loop, None)
+        if session is not None:
+            await session.close()
+
+    def endpoint_for(self, url: str) -> Endpoint:
+        """The configured endpoint for ``url``, or one with default settings"""
+        endpoint = self._by_url.get(url)
+        if endpoint is None:
+            endpoint = Endpoint(name=url, url=url)
+            self._by_url[url] = endpoint
+            self._breakers[url] = CircuitBreaker()
+            self._stats[url] = EndpointStats()
+        return endpoint
+
+    async def call(self, name: str, payload: dict) -> str:
+        return await self.request(self.endpoints[name], payload)
+
+    async def request(self, endpoint: Endpoint, payload: dict) -> str:
+        """POST ``payload`` as JSON within the endpoint's budget; returns the response body"""
+        breaker = self._breakers[endpoint.name]
+        stats = self._stats[endpoint.name]
+        if not breaker.allow():
+            stats.count("rejected")
+            raise CircuitOpenError(f"error: {endpoint.name} is temporarily unavailable")
+
+        started = time.monotonic()
+        deadline = started + endpoint.budget
+        attempt = 0
+        try:
+            while True:
+                try:
+                    body = await self._hedged(endpoint, payload, deadline - time.monotonic(), stats)
+                except (aiohttp.ClientError, asyncio.TimeoutError, HTTPStatusError) as e:
+                    retryable = not isinstance(e, HTTPStatusError) or e.retryable
+                    if retryable:
+                        breaker.record_failure()
+                    else:
+                        # The endpoint is healthy, the request was bad
+                        breaker.record_success()
+                    delay = random.uniform(0, endpoint.backoff * 2**attempt)
+                    if not retryable or attempt >= endpoint.retries or time.monotonic() + delay >= deadline:
+                        stats.observe(time.monotonic() - started, error=True)
+                        if isinstance(e, ToolError):
+                            raise
+                        raise ToolError(f"error: {e!s}") from e
+                    attempt += 1
+                    stats.count("retries")
+                    await asyncio.sleep(delay)
+                else:
+                    breaker.record_success()
+                    stats.observe(time.monotonic() - started)
+                    return body
+        except asyncio.CancelledError:
+            breaker.abandon()
+            raise
+        except ToolError:
+            raise
+        except Exception:
+            # Anything unexpected (a closed session, a bad response) still has to settle a half-open probe
+            breaker.record_failure()
+            stats.observe(time.monotonic() - started, error=True)
+            raise
+
+    async def _attempt(self, endpoint: Endpoint, payload: dict, timeout: float) -> str:
+        if timeout <= 0:
+            raise asyncio.TimeoutError()
+        session = self.session()
+        client_timeout = aiohttp.ClientTimeout(total=timeout)
+        async with session.post(endpoint.url, timeout=client_timeout, json=payload) as resp:
+            body = await resp.text()
+            if resp.status >= 400:
+                raise HTTPStatusError(resp.status, body)
+            return body
+
+    async def _hedged(self, endpoint: Endpoint, payload: dict, timeout: float, stats: EndpointStats) -> str:
+        hedge_after = endpoint.hedge_after
+        if hedge_after is None or hedge_after >= timeout:
+            return await self._attempt(endpoint, payload, timeout)
+
+        pending = {asyncio.ensure_future(self._attempt(endpoint, payload, timeout))}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=hedge_after)
+            if done:
+                return done.pop().result()
+            stats.count("hedges")
+            pending.add(asyncio.ensure_future(self._attempt(endpoint, payload, timeout - hedge_after)))
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        """{endpoint: {calls, errors, retries, hedges, rejected, p50_ms, p95_ms, p99_ms, breaker}}"""
+        return {
+            name: dict(stats.summary(), breaker=self._breakers[name].state)
+            for name, stats in self._stats.items()
+        }
@@ -0,0 +1,171 @@
+"""Warm-up of models and connections before a caller's first turn.
+
+``prewarm`` runs once per worker process before any job arrives. It loads the
+models and runs a dummy inference pass, so the first real call doesn't pay
+for ONNX session initialization. Some warm-up can only happen inside a job,
+because it needs the job's inference executor and event loop:
+
+* the turn detector gets one throwaway end-of-turn prediction;
+* a keep-alive connection is opened to each tool backend origin.
+
+Both run in the background while the session connects to the room.
+
+``FirstTurnProbe`` measures what is left of the cold start. It records the
+time from job start to the greeting being spoken, and from the end of the
+caller's first utterance to the agent's first reply.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections.abc import Awaitable
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+from livekit import rtc
+from livekit.agents import llm
+
+from tool_http import ToolDispatcher
+
+logger = logging.getLogger("warmup")
+
+
+class StepTimings:
+    """Wall time of each named warm-up step, in milliseconds"""
+
+    def __init__(self) -> None:
+        self.steps: dict[str, float] = {}
+        self.failed: list[str] = []
+
+    @contextmanager
+    def step(self, name: str, required: bool = False):
+        """Time the block; a failing optional step is logged and skipped, a required one re-raises"""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.failed.append(name)
+            if required:
+                raise
+            logger.warning("warm-up step %s failed: %s", name, e)
+        finally:
+            self.steps[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    def summary(self) -> dict:
+        return {"steps_ms": dict(self.steps), "failed": list(self.failed)}
+
+
+def _run_in_thread(coroutine: Callable[[], Awaitable[Any]]) -> Any:
+    """Run a coroutine to completion on a private event loop, from sync code that may already be in one"""
+    outcome: dict[str, Any] = {}
+
+    def target() -> None:
+        try:
+            outcome["result"] = asyncio.run(coroutine())
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, name="warmup")
+    thread.start()
+    thread.join()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome.get("result")
+
+
+async def _vad_pass(vad: Any, seconds: float) -> None:
+    stream = vad.stream()
+    frame = rtc.AudioFrame.create(sample_rate=16000, num_channels=1, samples_per_channel=160)
+    for _ in range(int(seconds * 100)):
+        stream.push_frame(frame)
+    stream.end_input()
+    async for _ in stream:
+        pass
+    await stream.aclose()
+
+
+def warm_vad(vad: Any, seconds: float = 0.5) -> None:
+    """Push a short stretch of silence through the VAD so its inference session is initialized"""
+    _run_in_thread(lambda: _vad_pass(vad, seconds))
+
+
+def _origins(tools: ToolDispatcher) -> list[str]:
+    origins = []
+    for endpoint in tools.endpoints.values():
+        parts = urlsplit(endpoint.url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        if origin not in origins:
+            origins.append(origin)
+    return origins
+
+
+async def warm_turn_detector(model: Any) -> None:
+    """One end-of-turn prediction on a canned exchange"""
+    chat_ctx = llm.ChatContext.empty()
+    chat_ctx.add_message(role="assistant", content="Hi, I'm Rahul from Salesforce. How can I help you today?")
+    chat_ctx.add_message(role="user", content="I'd like to know about pricing.")
+    await model.predict_end_of_turn(chat_ctx)
+
+
+async def warm_connections(tools: ToolDispatcher, timeout: float = 5.0) -> None:
+    """Open a pooled keep-alive connection to every tool backend origin.
+
+    Goes through the job's own connector, so the DNS answer lands in its
+    ``ttl_dns_cache`` along with the TCP + TLS handshake.
+    """
+    session = tools.session()
+
+    async def open_connection(origin: str) -> None:
+        # Any answer will do; the point is the handshake and the pooled connection
+        async with session.head(f"{origin}/", timeout=aiohttp.ClientTimeout(total=timeout)):
+            pass
+
+    await asyncio.gather(*(open_connection(origin) for origin in _origins(tools)))
+
+
+async def warm_job(timings: StepTimings, turn_detector: Any, tools: ToolDispatcher) -> None:
+    """Per-job warm-up, run concurrently with connecting to the room"""
+
+    async def timed(name: str, coroutine: Awaitable[Any]) -> None:
+        with timings.step(name):
+            await coroutine
+
+    await asyncio.gather(
+        timed("turn_detector", warm_turn_detector(turn_detector)),
+        timed("tool_connections", warm_connections(tools)),
+    )
+    logger.info("job warm-up finished: %s", timings.summary())
+
+
+class FirstTurnProbe:
+    """Cold-start latency of a job's first spoken turns"""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.greeting_ms: Optional[float] = None
+        self.first_reply_ms: Optional[float] = None
+        self._user_stopped: Optional[float] = None
+
+    def attach(self, session: Any) -> None:
+        session.on("user_state_changed", self._on_user_state)
+        session.on("agent_state_changed", self._on_agent_state)
+
+    def _on_user_state(self, ev: Any) -> None:
+        if ev.old_state == "speaking" and self.greeting_ms is not None and self.first_reply_ms is None:
+            self._user_stopped = time.perf_counter()
+
+    def _on_agent_state(self, ev: Any) -> None:
+        if ev.new_state != "speaking":
+            return
+        now = time.perf_counter()
+        if self.greeting_ms is None:
+            self.greeting_ms = round((now - self.started) * 1000, 1)
+            logger.info("first spoken turn (greeting) %.0f ms after job start", self.greeting_ms)
+        elif self.first_reply_ms is None and self._user_stopped is not None:
+            self.first_reply_ms = round((now - self._user_stopped) * 1000, 1)
+            logger.info("first reply %.0f ms after the caller stopped speaking", self.first_reply_ms)
+
+    def summary(self) -> dict:
+        return {"greeting_ms": self.greeting_ms, "first_reply_ms": self.first_reply_ms}
@@ -1,21 +1,35 @@
+import time
+# Streamlit re-executes this whole file on every full rerun; measured from here
+SCRIPT_STARTED = time.perf_counter()
 import streamlit as st
-import requests
 import os
 import base64
+import functools
+import hashlib
+import asyncio
+import logging
 import tempfile
-import numpy as np
-import matplotlib.pyplot as plt
+import threading
+import uuid
 from audiorecorder import audiorecorder
 from io import BytesIO
-import google.generativeai as genai
+import streamlit.components.v1 as components
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from audio_processing import export_wav_bytes
+from audio_store import AudioServer, AudioStore
+from cache import DiskCache, LRUCache, TieredCache, content_key
+from chat_memory import ChatMemory
+from conversation_export import EXPORT_FORMATS, export_conversation
+from conversation_store import Conversation, is_valid_session_id, open_store
+from dispatch import ProviderGate
+from metrics import Metrics
+from murf_client import MURF_API_URL, SERVER_ERROR_STATUSES, TTS_PROFILES, MurfClient, MurfError, speech_payload
+from tts_pipeline import OrderedSynthesizer, SentenceBuffer, split_sentences
+from voice_pipeline import TurnPipeline
+from vad import trim_silence
+from waveform import audio_hash, render_waveform
 
-st.set_page_config(
-    page_title="Voice Chat with Murf AI",
-    page_icon="🎙️",
-    layout="centered"
-)
-
-st.markdown("""
+APP_CSS = """
     <style>
     .stApp {
         background-color: #0e1117;
@@ -43,6 +57,11 @@ st.markdown("""
         text-transform: uppercase;
         letter-spacing: 0.05em;
     }
+    .message-meta {
+        color: #6b7280;
+        font-size: 0.75rem;
+        margin-top: 0.5rem;
+    }
     .message-content {
         color: #e5e7eb;
         font-size: 1rem;
@@ -107,16 +126,295 @@ st.markdown("""
         text-align: center;
     }
     </style>
-""", unsafe_allow_html=True)
+"""
+
+@st.cache_data
+def compact_css(css):
+    """Strip indentation and newlines so the per-rerun style block stays small"""
+    return " ".join(line.strip() for line in css.splitlines() if line.strip())
+
+
+# Per-stage latency histograms: rolling window size, and one JSON log line per turn
+METRICS_WINDOW = int(os.getenv("METRICS_WINDOW", "512"))
+# Streamlit leaves the root logger unconfigured, so the turn log gets its own handler
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+@st.cache_resource
+def get_logger():
+    """The app's logger, writing to stderr at LOG_LEVEL; configured once per process"""
+    logger = logging.getLogger("voice_chat")
+    logger.setLevel(LOG_LEVEL)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s"))
+        logger.addHandler(handler)
+    # Don't log twice if the host process configures the root logger too
+    logger.propagate = False
+    return logger
+
+@st.cache_resource
+def get_metrics():
+    """Process-wide stage timings, byte and error counters"""
+    return Metrics(window=METRICS_WINDOW)
+
+# Display order for the sidebar latency panel; unknown stages are appended
+METRIC_STAGES = (
+    "vad", "audio_export", "stt", "llm_first_token", "llm", "tts_generate",
+    "tts_download", "mp3_decode", "waveform_render", "cold_start", "script_run",
+)
+
+def metrics_table(snapshot):
+    """Markdown table of per-stage latency percentiles, bytes and errors"""
+    stages = [stage for stage in METRIC_STAGES if stage in snapshot]
+    stages += sorted(stage for stage in snapshot if stage not in METRIC_STAGES)
+    ms = lambda value: f"{value * 1000:.0f}" if value is not None else "–"
+    rows = ["| Stage | n | p50 ms | p95 ms | p99 ms | KB | err |", "|---|---|---|---|---|---|---|"]
+    for stage in stages:
+        summary = snapshot[stage]
+        rows.append(
+            f"| {stage} | {summary['count']} | {ms(summary['p50_s'])} | {ms(summary['p95_s'])} "
+            f"| {ms(summary['p99_s'])} | {summary['bytes'] / 1024:.0f} | {summary['errors']} |"
+        )
+    return "\n".join(rows)
+
+def timed(stage):
+    """Decorator recording each completed call of a page section as ``stage``"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_metrics().span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+@st.cache_resource
+def process_state():
+    """Created once per server process; tells the first (cold) script run from later ones"""
+    return {"warm": False}
+
+def record_script_run():
+    """Time this full script run from the top of the file, split into cold start and reruns"""
+    state = process_state()
+    stage = "script_run" if state["warm"] else "cold_start"
+    state["warm"] = True
+    get_metrics().observe(stage, time.perf_counter() - SCRIPT_STARTED)
+
+def log_turn(timings):
+    """Emit one structured log line for a finished turn"""
+    get_logger().info(get_metrics().log_line(event="turn", timings=timings))
+
+# Provider quotas: every Gemini and Murf request in the process is paced to these
+# rates (requests/s, with bursts of GEMINI_BURST/MURF_BURST) and concurrency limits
+GEMINI_RPS = float(os.getenv("GEMINI_RPS", "10"))
+GEMINI_BURST = float(os.getenv("GEMINI_BURST", "10"))
+GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", "8"))
+MURF_RPS = float(os.getenv("MURF_RPS", "10"))
+MURF_BURST = float(os.getenv("MURF_BURST", "10"))
+MURF_CONCURRENCY = int(os.getenv("MURF_CONCURRENCY", "8"))
+
+@st.cache_resource
+def get_provider_gates():
+    """Process-wide single-flight + rate-limit gates, shared by all sessions"""
+    return {
+        "gemini": ProviderGate("gemini", GEMINI_RPS, burst=GEMINI_BURST, max_concurrent=GEMINI_CONCURRENCY),
+        "murf": ProviderGate("murf", MURF_RPS, burst=MURF_BURST, max_concurrent=MURF_CONCURRENCY),
+    }
+
+def get_provider_gate(provider):
+    return get_provider_gates()[provider]
 
 # Initialize Gemini AI client
 # Using Gemini 2.0 Flash for fast, intelligent responses
+GEMINI_MODEL = "gemini-2.0-flash"
+
+# Prompt budget for chat context: rolling summary + verbatim recent turns
+CHAT_TOKEN_BUDGET = int(os.getenv("CHAT_TOKEN_BUDGET", "3000"))
+CHAT_RECENT_TURNS = int(os.getenv("CHAT_RECENT_TURNS", "12"))
+
+# Alternative Gemini REST endpoint (host[:port]), e.g. the benchmark's local stand-in
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+
+@st.cache_resource
+def configure_gemini(api_key):
+    """Configure the Gemini SDK once per process and key"""
+    # Imported on first use: the SDK (gRPC, protobuf) is slow to load and most reruns never call it
+    import google.generativeai as genai
+    if GEMINI_API_ENDPOINT:
+        genai.configure(
+            api_key=api_key,
+            transport="rest",
+            client_options={"api_endpoint": GEMINI_API_ENDPOINT},
+        )
+    else:
+        genai.configure(api_key=api_key)
+    return True
+
 def get_gemini_client():
     api_key = os.getenv("GOOGLE_API_KEY")
     if not api_key:
         return None
-    genai.configure(api_key=api_key)
-    return True
+    return configure_gemini(api_key)
+
+@st.cache_resource
+def get_gemini_model():
+    """Shared GenerativeModel instance, reused by every request"""
+    import google.generativeai as genai
+    return genai.GenerativeModel(GEMINI_MODEL)
+
+def summarize_turns(model, summary, turns):
+    """Fold dropped turns into the running conversation summary with Gemini"""
+    transcript = "\n".join(f"{turn['role']}: {turn['text']}" for turn in turns)
+    response = model.generate_content(
+        "Update this running summary of a conversation between a user and an assistant. "
+        "Keep names, facts and open questions; stay under 120 words. "
+        f"Return only the summary.\n\nCurrent summary: {summary or '(none)'}\n\nNew turns:\n{transcript}"
+    )
+    return response.text.strip()
+
+def get_chat_memory():
+    """This session's bounded conversation context"""
+    if "chat_memory" not in st.session_state:
+        model = get_gemini_model()
+        gate = get_provider_gate("gemini")
+        st.session_state.chat_memory = ChatMemory(
+            token_budget=CHAT_TOKEN_BUDGET,
+            max_recent_turns=CHAT_RECENT_TURNS,
+            summarize=lambda summary, turns: gate.call(summarize_turns, model, summary, turns),
+        )
+        # A resumed session picks up its recent turns from the conversation store
+        pending_user = None
+        for message in get_conversation().recent(CHAT_RECENT_TURNS):
+            if message["role"] == "user":
+                pending_user = message["content"]
+            elif pending_user is not None:
+                st.session_state.chat_memory.add_exchange(pending_user, message["content"])
+                pending_user = None
+    return st.session_state.chat_memory
+
+def prompt_token_count(response):
+    """Prompt tokens Gemini reports for a response, if available"""
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "prompt_token_count", None) if usage else None
+
+# Resample recordings to 16 kHz mono before upload (set STT_NORMALIZE=0 to send as recorded)
+STT_NORMALIZE = os.getenv("STT_NORMALIZE", "1") != "0"
+
+# Trim silence around (and optionally inside) recordings before upload; VAD_TRIM=0 disables it
+VAD_TRIM = os.getenv("VAD_TRIM", "1") != "0"
+VAD_THRESHOLD_DB = float(os.getenv("VAD_THRESHOLD_DB", "-45"))
+VAD_HANGOVER_MS = int(os.getenv("VAD_HANGOVER_MS", "300"))
+VAD_MAX_PAUSE_MS = int(os.getenv("VAD_MAX_PAUSE_MS", "0")) or None
+
+@st.cache_resource
+def get_stt_counters():
+    """Process-wide speech-to-text upload byte counters"""
+    return {
+        "calls": 0, "source_bytes": 0, "upload_bytes": 0, "stt_s": 0.0,
+        "recorded_s": 0.0, "uploaded_s": 0.0, "lock": threading.Lock(),
+    }
+
+def record_stt_upload(upload_stats):
+    """Accumulate one upload into the process counters and remember it for this session"""
+    counters = get_stt_counters()
+    with counters["lock"]:
+        counters["calls"] += 1
+        counters["source_bytes"] += upload_stats["source_bytes"]
+        counters["upload_bytes"] += upload_stats["upload_bytes"]
+        counters["stt_s"] += upload_stats["stt_s"]
+        counters["recorded_s"] += upload_stats.get("original_s", upload_stats["duration_s"])
+        counters["uploaded_s"] += upload_stats["duration_s"]
+    st.session_state.last_stt = upload_stats
+
+# Transcript cache: memory LRU plus an optional disk tier (TRANSCRIPT_CACHE_DISK_MB=0 disables it)
+TRANSCRIPT_CACHE_DIR = os.getenv(
+    "TRANSCRIPT_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "transcripts")
+)
+TRANSCRIPT_CACHE_MEMORY_ITEMS = int(os.getenv("TRANSCRIPT_CACHE_MEMORY_ITEMS", "512"))
+TRANSCRIPT_CACHE_DISK_MB = int(os.getenv("TRANSCRIPT_CACHE_DISK_MB", "32"))
+
+@st.cache_resource
+def get_transcript_cache():
+    """Process-wide transcripts keyed by recording content, shared by sessions and batch runs"""
+    memory = LRUCache(max_items=TRANSCRIPT_CACHE_MEMORY_ITEMS, max_bytes=8 * 1024 * 1024)
+    disk = None
+    if TRANSCRIPT_CACHE_DISK_MB > 0:
+        try:
+            disk = DiskCache(TRANSCRIPT_CACHE_DIR, max_bytes=TRANSCRIPT_CACHE_DISK_MB * 1024 * 1024, suffix=".txt")
+        except OSError:
+            pass
+    return TieredCache(memory, disk)
+
+def transcript_cache_key(audio_data):
+    """Cache key over the recording's PCM content and every setting that changes the transcript"""
+    return content_key(
+        pcm=audio_hash(audio_data),
+        model=GEMINI_MODEL,
+        normalize=STT_NORMALIZE,
+        vad=VAD_TRIM and [VAD_THRESHOLD_DB, VAD_HANGOVER_MS, VAD_MAX_PAUSE_MS],
+    )
+
+def cached_transcript(audio_data):
+    """Transcript of an identical recording seen before, or None"""
+    text = get_transcript_cache().get(transcript_cache_key(audio_data))
+    return text.decode("utf-8") if text else None
+
+def transcribe_recording(audio_data, check_cache=True):
+    """Transcribe a pydub recording with Gemini; raises instead of rendering errors.
+
+    Returns ``(text, upload_stats)``; text is None when the recording holds no
+    speech. Identical recordings are answered from the transcript cache, with
+    ``upload_stats`` holding only ``cached``. Callers that already missed in
+    ``cached_transcript`` pass ``check_cache=False`` so the miss is counted once.
+    """
+    cache_key = transcript_cache_key(audio_data)
+    cached = get_transcript_cache().get(cache_key) if check_cache else None
+    if cached:
+        return cached.decode("utf-8"), {"cached": True}
+
+    metrics = get_metrics()
+    recorded_bytes = len(audio_data.raw_data)
+    vad_stats = {}
+    if VAD_TRIM:
+        # Don't pay upload time, latency and quota for silence
+        with metrics.span("vad"):
+            audio_data, vad_stats = trim_silence(
+                audio_data,
+                threshold_db=VAD_THRESHOLD_DB,
+                hangover_ms=VAD_HANGOVER_MS,
+                max_pause_ms=VAD_MAX_PAUSE_MS,
+            )
+        if not vad_stats["speech_detected"]:
+            return None, vad_stats
+    
+    # Encode audio in memory (optionally downsampled to 16 kHz mono)
+    with metrics.span("audio_export") as span:
+        audio_content, upload_stats = export_wav_bytes(audio_data, normalize=STT_NORMALIZE)
+        span["bytes"] = upload_stats["upload_bytes"]
+    # Count savings against the recording as it was made, before trimming
+    upload_stats["source_bytes"] += recorded_bytes - len(audio_data.raw_data)
+    upload_stats.update(vad_stats)
+    
+    # Upload and transcribe using Gemini
+    with metrics.span("stt") as span:
+        started = time.perf_counter()
+        model = get_gemini_model()
+        
+        def transcribe():
+            response = model.generate_content([
+                "Please transcribe the following audio. Return only the transcribed text without any additional commentary.",
+                {"mime_type": "audio/wav", "data": audio_content}
+            ])
+            return response.text
+        
+        # The same upload in flight twice (double click, two tabs) is sent once
+        text = get_provider_gate("gemini").call(
+            transcribe, key=f"stt:{hashlib.sha256(audio_content).hexdigest()}"
+        )
+        span["bytes"] = len(audio_content)
+        upload_stats["stt_s"] = time.perf_counter() - started
+    if text:
+        get_transcript_cache().put(cache_key, text.encode("utf-8"))
+    return text or None, upload_stats
 
 def transcribe_audio(audio_data):
     """Transcribe audio using Gemini AI"""
@@ -125,156 +423,651 @@ def transcribe_audio(audio_data):
         return None
     
     try:
-        # Save audio to temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_file:
-            audio_data.export(tmp_file.name, format="wav")
-            tmp_file_path = tmp_file.name
-        
-        # Upload and transcribe using Gemini
-        with open(tmp_file_path, "rb") as audio_file:
-            with st.spinner("Transcribing audio..."):
-                audio_content = audio_file.read()
-                model = genai.GenerativeModel('gemini-2.0-flash')
-                response = model.generate_content([
-                    "Please transcribe the following audio. Return only the transcribed text without any additional commentary.",
-                    {"mime_type": "audio/wav", "data": audio_content}
-                ])
-        
-        # Clean up temp file
-        os.unlink(tmp_file_path)
-        
-        return response.text if response.text else None
+        with st.spinner("Transcribing audio..."):
+            text, upload_stats = transcribe_recording(audio_data)
     except Exception as e:
         st.error(f"Error transcribing audio: {str(e)}")
         return None
+    if not upload_stats.get("speech_detected", True):
+        st.warning("No speech detected in the recording. Please try again.")
+        return None
+    if not upload_stats.get("cached"):
+        record_stt_upload(upload_stats)
+    return text
+
+def generate_reply(user_message, memory, timings=None):
+    """One Gemini reply to ``user_message`` in ``memory``'s context; raises instead of rendering errors"""
+    with get_metrics().span("llm") as span:
+        model = get_gemini_model()
+        # Summary + recent window + new message, instead of the full history
+        response = get_provider_gate("gemini").call(model.generate_content, memory.build_contents(user_message))
+        text = response.text
+        span["bytes"] = len(text or "")
+    if timings is not None:
+        timings["prompt_tokens"] = prompt_token_count(response) or memory.prompt_tokens(user_message)
+    if text:
+        memory.add_exchange(user_message, text)
+    return text or None
+
+def get_ai_response(messages, timings=None, memory=None):
+    """Get AI response using Google Gemini
 
-def get_ai_response(messages):
-    """Get AI response using Google Gemini"""
+    ``memory`` defaults to this session's ChatMemory.
+    """
     if not get_gemini_client():
         st.error("GOOGLE_API_KEY not found. Please provide it to enable AI chat.")
         return None
     
     try:
         with st.spinner("Thinking..."):
-            model = genai.GenerativeModel('gemini-2.0-flash')
-            
-            # Convert messages format for Gemini
-            conversation = []
-            for msg in messages:
-                if msg["role"] == "user":
-                    conversation.append({"role": "user", "parts": [msg["content"]]})
-                else:
-                    conversation.append({"role": "model", "parts": [msg["content"]]})
-            
-            response = model.generate_content(
-                conversation[-1]["parts"][0] if conversation else "Hello"
-            )
-        return response.text if response.text else None
+            user_message = messages[-1]["content"] if messages else "Hello"
+            return generate_reply(user_message, memory or get_chat_memory(), timings)
     except Exception as e:
         st.error(f"Error getting AI response: {str(e)}")
         return None
 
-def call_murf_tts(text, voice_id="en-US-ken"):
-    """Call Murf Falcon TTS API to convert text to speech"""
-    api_key = os.getenv("MURF_API_KEY")
-    
-    if not api_key:
-        st.error("MURF_API_KEY not found in environment variables")
-        return None
+def get_ai_response_stream(messages, timings=None):
+    """Stream AI response text from Google Gemini as it is generated.
+
+    Fills ``timings`` with ``first_token_s``, ``total_s`` and ``prompt_tokens``
+    for the turn.
+    """
+    if timings is None:
+        timings = {}
+    if not get_gemini_client():
+        st.error("GOOGLE_API_KEY not found. Please provide it to enable AI chat.")
+        return
     
-    url = "https://api.murf.ai/v1/speech/generate"
+    started = time.perf_counter()
+    metrics = get_metrics()
+    memory = get_chat_memory()
+    user_message = messages[-1]["content"] if messages else "Hello"
+    reply = []
+    try:
+        model = get_gemini_model()
+        # Only opening the stream is paced; chunks then arrive on the open response
+        response = get_provider_gate("gemini").call(
+            functools.partial(model.generate_content, stream=True), memory.build_contents(user_message)
+        )
+        for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. safety metadata only)
+                continue
+            if not text:
+                continue
+            if "first_token_s" not in timings:
+                timings["first_token_s"] = time.perf_counter() - started
+                metrics.observe("llm_first_token", timings["first_token_s"])
+            reply.append(text)
+            yield text
+        timings["prompt_tokens"] = prompt_token_count(response) or memory.prompt_tokens(user_message)
+        reply_text = "".join(reply)
+        metrics.observe("llm", time.perf_counter() - started, len(reply_text))
+        if reply:
+            memory.add_exchange(user_message, reply_text)
+    except Exception as e:
+        metrics.error("llm")
+        st.error(f"Error getting AI response: {str(e)}")
+    finally:
+        timings["total_s"] = time.perf_counter() - started
+
+# TTS cache sizing; the disk tier lives next to the app so it survives restarts
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "tts"))
+TTS_CACHE_MEMORY_ITEMS = int(os.getenv("TTS_CACHE_MEMORY_ITEMS", "256"))
+TTS_CACHE_MEMORY_MB = int(os.getenv("TTS_CACHE_MEMORY_MB", "64"))
+TTS_CACHE_DISK_MB = int(os.getenv("TTS_CACHE_DISK_MB", "512"))
+
+@st.cache_resource
+def get_tts_cache():
+    """Process-wide TTS audio cache shared by all Streamlit sessions"""
+    memory = LRUCache(max_items=TTS_CACHE_MEMORY_ITEMS, max_bytes=TTS_CACHE_MEMORY_MB * 1024 * 1024)
+    try:
+        disk = DiskCache(TTS_CACHE_DIR, max_bytes=TTS_CACHE_DISK_MB * 1024 * 1024, suffix=".mp3")
+    except OSError:
+        # Read-only filesystem: fall back to the memory tier only
+        disk = None
+    return TieredCache(memory, disk)
+
+def tts_cache_key(payload):
+    """Cache key over every payload field that changes the synthesized audio"""
+    return content_key(
+        text=payload["text"],
+        voice_id=payload["voiceId"],
+        style=payload["style"],
+        rate=payload["rate"],
+        pitch=payload["pitch"],
+        format=payload["format"],
+        sample_rate=payload["sampleRate"],
+        channel_type=payload["channelType"],
+        model_version=payload["modelVersion"],
+    )
+
+# Number of sentence chunks synthesized concurrently in pipelined mode
+TTS_PIPELINE_WORKERS = int(os.getenv("TTS_PIPELINE_WORKERS", "3"))
+
+# Murf client tuning (MURF_API_URL can point at a local stand-in, e.g. for benchmarks)
+MURF_API_URL = os.getenv("MURF_API_URL", MURF_API_URL)
+MURF_INLINE_AUDIO = os.getenv("MURF_INLINE_AUDIO", "1") != "0"
+MURF_POOL_SIZE = int(os.getenv("MURF_POOL_SIZE", "10"))
+MURF_MAX_RETRIES = int(os.getenv("MURF_MAX_RETRIES", "3"))
+
+@st.cache_resource
+def get_murf_client():
+    """Process-wide Murf client; its connection pool survives reruns and sessions"""
+    return MurfClient(
+        base_url=MURF_API_URL,
+        metrics=get_metrics(),
+        inline_audio=MURF_INLINE_AUDIO,
+        pool_size=max(MURF_POOL_SIZE, TTS_PIPELINE_WORKERS),
+        max_retries=MURF_MAX_RETRIES,
+        # The Murf provider gate retries 429s and pauses every caller on the first one
+        retry_statuses=SERVER_ERROR_STATUSES,
+    )
+
+# Output format: one of TTS_PROFILES, or Auto to pick by reply length
+TTS_PROFILE_AUTO = "Auto (by reply length)"
+TTS_PROFILE = os.getenv("TTS_PROFILE", TTS_PROFILE_AUTO)
+TTS_LOW_LATENCY = "Low latency (mono 24 kHz)"
+TTS_BANDWIDTH_SAVER = "Bandwidth saver (mono 8 kHz)"
+TTS_HIFI = "Hi-fi (stereo 48 kHz)"
+# Auto: short replies in hi-fi, long ones in the smallest format
+TTS_AUTO_HIFI_CHARS = int(os.getenv("TTS_AUTO_HIFI_CHARS", "200"))
+TTS_AUTO_SAVER_CHARS = int(os.getenv("TTS_AUTO_SAVER_CHARS", "1200"))
+
+def resolve_tts_profile(selected, text_length=None):
+    """Concrete profile for a reply; ``text_length`` is None while the reply is still streaming"""
+    if selected in TTS_PROFILES:
+        return selected
+    if text_length is None:
+        # Length unknown: optimize for time to first audio
+        return TTS_LOW_LATENCY
+    if text_length <= TTS_AUTO_HIFI_CHARS:
+        return TTS_HIFI
+    if text_length >= TTS_AUTO_SAVER_CHARS:
+        return TTS_BANDWIDTH_SAVER
+    return TTS_LOW_LATENCY
+
+@st.cache_resource
+def get_tts_profile_stats():
+    """Process-wide per-profile synthesis counters"""
+    return {"profiles": {}, "lock": threading.Lock()}
+
+def record_tts_profile(profile, info):
+    """Accumulate one Murf call's size, speech duration and timings under its profile"""
+    stats = get_tts_profile_stats()
+    with stats["lock"]:
+        totals = stats["profiles"].setdefault(
+            profile, {"calls": 0, "bytes": 0, "audio_s": 0.0, "request_s": 0.0, "download_s": 0.0}
+        )
+        totals["calls"] += 1
+        for name in ("bytes", "audio_s", "request_s", "download_s"):
+            totals[name] += info.get(name, 0)
+
+def synthesize_speech(text, voice_id="en-US-ken", profile=None):
+    """Synthesize text with Murf and return MP3 bytes; raises instead of rendering errors"""
+    profile = profile or resolve_tts_profile(TTS_PROFILE, len(text))
+    payload = speech_payload(text, voice_id, **TTS_PROFILES[profile])
     
-    headers = {
-        "Content-Type": "application/json",
-        "api-key": api_key
-    }
+    # Serve repeated replies (greetings, error messages, ...) without a network hop
+    cache = get_tts_cache()
+    cache_key = tts_cache_key(payload)
+    cached_audio = cache.get(cache_key)
+    if cached_audio:
+        return cached_audio
     
-    payload = {
-        "voiceId": voice_id,
-        "style": "Conversational",
-        "text": text,
-        "rate": 0,
-        "pitch": 0,
-        "sampleRate": 48000,
-        "format": "MP3",
-        "channelType": "STEREO",
-        "pronunciationDictionary": {},
-        "encodeAsBase64": False,
-        "variation": 1,
-        "audioDuration": 0,
-        "modelVersion": "GEN2"
-    }
+    def generate():
+        # A flight that just finished may have filled the cache meanwhile
+        audio = cache.get(cache_key)
+        if audio:
+            return audio
+        info = {}
+        audio = get_murf_client().generate(payload, info)
+        record_tts_profile(profile, info)
+        cache.put(cache_key, audio)
+        return audio
     
+    # Identical concurrent requests (e.g. the same canned message) share one Murf call
+    return get_provider_gate("murf").call(generate, key=cache_key)
+
+def call_murf_tts(text, voice_id="en-US-ken", profile=None):
+    """Call Murf Falcon TTS API to convert text to speech"""
     try:
         with st.spinner("Generating speech..."):
-            response = requests.post(url, json=payload, headers=headers, timeout=30)
-            
-            if response.status_code == 200:
-                result = response.json()
-                if "audioFile" in result:
-                    audio_url = result["audioFile"]
-                    audio_response = requests.get(audio_url, timeout=30)
-                    if audio_response.status_code == 200:
-                        return audio_response.content
-                return None
-            else:
-                st.error(f"API Error: {response.status_code} - {response.text}")
-                return None
+            return synthesize_speech(text, voice_id, profile)
+    except MurfError as e:
+        st.error(str(e))
+        return None
     except Exception as e:
         st.error(f"Error calling Murf API: {str(e)}")
         return None
 
+def queue_audio_chunk(turn_id, position, audio_bytes):
+    """Play one chunk of a reply as soon as the previous chunk of the same turn has ended"""
+    src = audio_src(audio_bytes)
+    # Each chunk lives in its own component iframe; chunks of a turn coordinate
+    # through localStorage and a BroadcastChannel so they play back in order.
+    components.html(f"""
+        <audio id="chunk" preload="auto" src="{src}"></audio>
+        <script>
+        const key = "murf-tts-{turn_id}";
+        const position = {position};
+        const audio = document.getElementById("chunk");
+        const channel = new BroadcastChannel(key);
+        let started = false;
+        function start() {{
+            if (started) return;
+            started = true;
+            audio.play();
+        }}
+        audio.onended = () => {{
+            localStorage.setItem(key, String(position));
+            channel.postMessage(position);
+        }};
+        channel.onmessage = (event) => {{ if (event.data >= position - 1) start(); }};
+        if (position === 0 || Number(localStorage.getItem(key) ?? -1) >= position - 1) start();
+        </script>
+    """, height=0)
+
+def speak_pipelined(chunks, voice_id="en-US-ken", timings=None, profile=TTS_LOW_LATENCY):
+    """Synthesize sentence chunks concurrently and play them in order as they finish.
+
+    ``chunks`` may be a lazy iterable (e.g. sentences from a streamed reply); an
+    empty string is a no-op that just gives finished audio a chance to play.
+    Every chunk uses the same ``profile`` so the parts concatenate into one clip.
+    """
+    # Worker threads need the script context to use Streamlit caches
+    ctx = get_script_run_ctx()
+    
+    def attach_context():
+        add_script_run_ctx(threading.current_thread(), ctx)
+    
+    turn_id = uuid.uuid4().hex
+    audio_parts = []
+    failures = 0
+    status = st.empty()
+    started = time.perf_counter()
+    
+    def play(results):
+        nonlocal failures
+        for index, _, audio, _ in results:
+            if not audio:
+                failures += 1
+                continue
+            if timings is not None and "first_audio_s" not in timings:
+                timings["first_audio_s"] = time.perf_counter() - started
+            queue_audio_chunk(turn_id, len(audio_parts), audio)
+            audio_parts.append(audio)
+            status.caption(f"🔊 Speaking chunk {index + 1}/{synthesizer.submitted}...")
+    
+    with OrderedSynthesizer(
+        lambda chunk: synthesize_speech(chunk, voice_id, profile),
+        max_workers=TTS_PIPELINE_WORKERS,
+        initializer=attach_context,
+    ) as synthesizer:
+        for chunk in chunks:
+            if chunk:
+                synthesizer.submit(chunk)
+            play(synthesizer.ready())
+        play(synthesizer.drain())
+    
+    if timings is not None and "first_audio_s" in timings:
+        status.caption(
+            f"🔊 First audio after {timings['first_audio_s']:.2f}s, "
+            f"{len(audio_parts)}/{synthesizer.submitted} chunks in {time.perf_counter() - started:.2f}s"
+        )
+    else:
+        status.empty()
+    if failures:
+        st.warning(f"Could not synthesize {failures} of {synthesizer.submitted} speech chunks.")
+    
+    # MP3 frames concatenate cleanly, so the parts form one replayable clip
+    return b"".join(audio_parts) if audio_parts else None
+
+# Durable chat history: "sqlite" (default) or "jsonl" append-only logs
+CONVERSATION_STORE = os.getenv("CONVERSATION_STORE", "sqlite")
+CONVERSATION_PATH = os.getenv(
+    "CONVERSATION_PATH",
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), ".cache",
+        "conversations" if CONVERSATION_STORE == "jsonl" else "conversations.sqlite3"
+    )
+)
+# Messages per session kept in memory; older ones are read from the store on demand
+CONVERSATION_HOT_WINDOW = int(os.getenv("CONVERSATION_HOT_WINDOW", "50"))
+
+@st.cache_resource
+def get_conversation_store():
+    """Process-wide conversation store shared by all sessions"""
+    return open_store(CONVERSATION_STORE, CONVERSATION_PATH)
+
+def get_conversation():
+    """This session's conversation"""
+    return st.session_state.conversation
+
+# Synthesized replies kept per turn for playback and the audio export bundle
+REPLY_AUDIO_DIR = os.getenv("REPLY_AUDIO_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "replies"))
+REPLY_AUDIO_DISK_MB = int(os.getenv("REPLY_AUDIO_DISK_MB", "256"))
+REPLY_AUDIO_MAX_AGE_H = float(os.getenv("REPLY_AUDIO_MAX_AGE_H", "24"))
+
+# Reply audio is served by URL from a small HTTP server next to Streamlit, bound to
+# loopback unless AUDIO_SERVER_HOST says otherwise. Browsers only get URLs when
+# AUDIO_PUBLIC_URL is the address they reach it at (e.g. a same-origin reverse proxy
+# path); otherwise audio is sent inline and the server only exposes /metrics locally
+AUDIO_SERVER_HOST = os.getenv("AUDIO_SERVER_HOST", "127.0.0.1")
+AUDIO_SERVER_PORT = int(os.getenv("AUDIO_SERVER_PORT", "8502"))
+AUDIO_PUBLIC_URL = os.getenv("AUDIO_PUBLIC_URL")
+
+@st.cache_resource
+def get_reply_audio_store():
+    """Process-wide store of reply audio, addressed by content hash"""
+    return AudioStore(
+        REPLY_AUDIO_DIR,
+        max_bytes=REPLY_AUDIO_DISK_MB * 1024 * 1024,
+        max_age_s=REPLY_AUDIO_MAX_AGE_H * 3600
+    )
+
+@st.cache_resource
+def get_audio_server():
+    """HTTP server for reply audio, or None if the port is unavailable"""
+    try:
+        return AudioServer(
+            get_reply_audio_store(),
+            host=AUDIO_SERVER_HOST,
+            port=AUDIO_SERVER_PORT,
+            public_url=AUDIO_PUBLIC_URL,
+            metrics_text=get_metrics().prometheus,
+        )
+    except OSError:
+        return None
+
+def reply_audio_url(audio_id):
+    """Browser URL for stored audio, or None when it has to be sent inline"""
+    server = get_audio_server()
+    return server.url(audio_id) if server else None
+
+def store_reply_audio(audio_content):
+    """Keep synthesized reply audio for the playback section and the export bundle"""
+    if audio_content:
+        audio_id = get_reply_audio_store().add(audio_content)
+        st.session_state.last_audio_id = audio_id
+        st.session_state.pending_audio_id = audio_id
+        st.session_state.show_waveform = True
+
+def add_assistant_message(text, timings=None):
+    """Append an assistant reply, linked to the audio synthesized for it this turn"""
+    message = {"role": "assistant", "content": text}
+    if timings:
+        message["timings"] = timings
+    audio_id = st.session_state.pop("pending_audio_id", None)
+    if audio_id:
+        message["audio_id"] = audio_id
+    get_conversation().append(message)
+
+def speak_reply(text, timings=None):
+    """Convert an assistant reply to speech and keep it for playback"""
+    voice_id = st.session_state.selected_voice
+    profile = resolve_tts_profile(st.session_state.tts_profile, len(text))
+    if timings is not None:
+        timings["tts_profile"] = profile
+    if st.session_state.pipelined_tts:
+        audio_content = speak_pipelined(split_sentences(text), voice_id, timings, profile)
+    else:
+        audio_content = call_murf_tts(text, voice_id, profile)
+    store_reply_audio(audio_content)
+
+def stream_reply(messages, timings):
+    """Stream the reply into an assistant bubble, speaking sentences as they complete"""
+    bubble = st.empty()
+    sentences = SentenceBuffer()
+    reply = ""
+    
+    def sentence_stream():
+        nonlocal reply
+        for text in get_ai_response_stream(messages, timings):
+            reply += text
+            bubble.markdown(message_html("assistant", reply + " ▌"), unsafe_allow_html=True)
+            # The empty string lets the speaker play audio that finished meanwhile
+            yield from sentences.feed(text) or [""]
+        yield from sentences.flush()
+        if reply:
+            bubble.markdown(message_html("assistant", reply), unsafe_allow_html=True)
+    
+    if st.session_state.pipelined_tts:
+        # Speech starts before the reply's length is known
+        profile = resolve_tts_profile(st.session_state.tts_profile)
+        timings["tts_profile"] = profile
+        store_reply_audio(speak_pipelined(sentence_stream(), st.session_state.selected_voice, timings, profile))
+    else:
+        for _ in sentence_stream():
+            pass
+        if reply:
+            speak_reply(reply, timings)
+    return reply or None
+
+def respond(messages):
+    """Generate the assistant reply for the conversation and speak it.
+
+    Returns the reply text (None on failure) and the per-turn timings.
+    """
+    timings = {}
+    if st.session_state.stream_llm:
+        response_text = stream_reply(messages, timings)
+    else:
+        started = time.perf_counter()
+        response_text = get_ai_response(messages, timings)
+        timings["total_s"] = time.perf_counter() - started
+        if response_text:
+            speak_reply(response_text, timings)
+    log_turn(timings)
+    return response_text, timings
+
+def message_html(role, content, meta=""):
+    """HTML for one chat bubble"""
+    css_class, label = ("user-message", "You") if role == "user" else ("assistant-message", "Assistant")
+    meta_html = f'<div class="message-meta">{meta}</div>' if meta else ""
+    return (
+        f'<div class="chat-message {css_class}">'
+        f'<div class="message-label">{label}</div>'
+        f'<div class="message-content">{content}</div>'
+        f'{meta_html}</div>'
+    )
+
+@st.cache_resource
+def get_message_html_memo():
+    """Process-wide memo of rendered bubbles.
+
+    Streamlit re-executes this script in a fresh module on every full rerun, so
+    the LRU is held as a cached resource to survive them. Message strings are
+    immutable and cache their hashes, so unchanged messages are never re-rendered.
+    """
+    return functools.lru_cache(maxsize=4096)(message_html)
+
+def cached_message_html(role, content, meta=""):
+    return get_message_html_memo()(role, content, meta)
+
+def format_timings(timings):
+    """One-line summary of a turn's measured latencies"""
+    labels = [("first_token_s", "first token"), ("total_s", "generation"), ("first_audio_s", "first audio")]
+    parts = [f"{label} {timings[key]:.2f}s" for key, label in labels if key in timings]
+    if timings.get("prompt_tokens"):
+        parts.append(f"prompt {timings['prompt_tokens']} tokens")
+    if timings.get("stages"):
+        stages = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings["stages"].items())
+        parts.append(f"stages: {stages}")
+    return " · ".join(parts)
+
+def audio_src(audio_bytes):
+    """URL for an <audio> element: served from the audio store, or a data URI fallback"""
+    server = get_audio_server()
+    if server and server.public_url:
+        # Only worth a disk write when the browser will fetch it by URL
+        return server.url(get_reply_audio_store().add(audio_bytes))
+    return f"data:audio/mp3;base64,{base64.b64encode(audio_bytes).decode()}"
+
 def autoplay_audio(audio_bytes):
     """Autoplay audio using HTML5 audio player"""
     if audio_bytes:
-        b64 = base64.b64encode(audio_bytes).decode()
         audio_html = f"""
             <audio autoplay>
-                <source src="data:audio/mp3;base64,{b64}" type="audio/mp3">
+                <source src="{audio_src(audio_bytes)}" type="audio/mp3">
             </audio>
         """
         st.markdown(audio_html, unsafe_allow_html=True)
 
-def plot_waveform(audio_data):
-    """Create a waveform visualization from audio data"""
+# Waveform output: "svg" skips matplotlib entirely, "png" renders with matplotlib
+WAVEFORM_FORMAT = os.getenv("WAVEFORM_FORMAT", "svg")
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_waveform(audio_key, _audio_data, fmt):
+    """Rendered waveform, cached by audio content hash so reruns reuse it"""
+    with get_metrics().span("waveform_render"):
+        return render_waveform(_audio_data, fmt)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def cached_mp3_waveform(audio_key, _mp3_bytes, fmt):
+    """Decode an MP3 reply and render its waveform, cached by the MP3's hash"""
+    from pydub import AudioSegment
+    metrics = get_metrics()
+    with metrics.span("mp3_decode") as span:
+        segment = AudioSegment.from_mp3(BytesIO(_mp3_bytes))
+        span["bytes"] = len(_mp3_bytes)
+    with metrics.span("waveform_render"):
+        return render_waveform(segment, fmt)
+
+def plot_waveform(audio_data, fmt=WAVEFORM_FORMAT):
+    """Create a waveform visualization from audio data (SVG markup or PNG bytes)"""
     try:
-        # Get audio samples
-        samples = np.array(audio_data.get_array_of_samples())
-        
-        # Create figure with dark theme
-        fig, ax = plt.subplots(figsize=(10, 2), facecolor='#0e1117')
-        ax.set_facecolor('#1f2937')
-        
-        # Plot waveform
-        time_axis = np.linspace(0, len(samples) / audio_data.frame_rate, len(samples))
-        ax.plot(time_axis, samples, color='#3b82f6', linewidth=0.5)
-        ax.fill_between(time_axis, samples, alpha=0.3, color='#3b82f6')
-        
-        # Styling
-        ax.set_xlabel('Time (s)', color='#9ca3af')
-        ax.set_ylabel('Amplitude', color='#9ca3af')
-        ax.tick_params(colors='#9ca3af')
-        ax.grid(True, alpha=0.2, color='#374151')
-        
-        plt.tight_layout()
-        return fig
+        return cached_waveform(audio_hash(audio_data), audio_data, fmt)
     except Exception as e:
         st.error(f"Error creating waveform: {str(e)}")
         return None
 
-def export_conversation():
-    """Export conversation to text file"""
-    if not st.session_state.messages:
-        return None
+def show_waveform(image):
+    """Display a rendered waveform"""
+    if isinstance(image, str):
+        st.markdown(image, unsafe_allow_html=True)
+    elif image:
+        st.image(image, use_container_width=True)
+
+def prepare_export(fmt):
+    """Stream the conversation into a temp file; only runs when an export is requested"""
+    discard_export()
+    with tempfile.NamedTemporaryFile(delete=False, suffix="." + EXPORT_FORMATS[fmt]["extension"]) as out:
+        export_conversation(get_conversation(), fmt, out, load_audio=get_reply_audio_store().get)
+    st.session_state.export_file = {"path": out.name, "format": fmt, "messages": len(get_conversation())}
+
+def discard_export():
+    """Delete the prepared export file, if any"""
+    prepared = st.session_state.pop("export_file", None)
+    if prepared:
+        try:
+            os.unlink(prepared["path"])
+        except OSError:
+            pass
+
+@st.fragment
+def export_panel():
+    """Sidebar export controls; nothing is built until the user asks for it"""
+    st.markdown("### 💾 Export")
+    fmt = st.selectbox("Format", options=list(EXPORT_FORMATS.keys()), key="export_format")
+    
+    prepared = st.session_state.get("export_file")
+    if prepared and (prepared["format"] != fmt or prepared["messages"] != len(get_conversation())):
+        discard_export()
+        prepared = None
+    
+    if not prepared:
+        if st.button("📦 Prepare Export", key="prepare_export"):
+            prepare_export(fmt)
+            st.rerun(scope="fragment")
+        return
     
-    export_text = "Voice Chat Conversation\n"
-    export_text += "=" * 50 + "\n\n"
+    with open(prepared["path"], "rb") as export_file:
+        st.download_button(
+            label="📥 Download Chat",
+            data=export_file,
+            file_name=f"voice_chat_conversation.{EXPORT_FORMATS[fmt]['extension']}",
+            mime=EXPORT_FORMATS[fmt]["mime"],
+            on_click=discard_export
+        )
+
+def start_turn():
+    """Cancel this session's in-flight turn, if any, and start a new pipeline"""
+    previous = st.session_state.get("active_turn")
+    if previous is not None:
+        previous.cancel()
+    
+    # Stage threads need the script context to render and use caches
+    ctx = get_script_run_ctx()
+    pipeline = TurnPipeline(thread_initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx))
+    st.session_state.active_turn = pipeline
+    st.session_state.pop("pending_audio_id", None)
+    return pipeline
+
+def conversation_for_ai():
+    """Chat history in the shape the AI helpers expect"""
+    return [{"role": msg["role"], "content": msg["content"]} for msg in get_conversation().recent(CHAT_RECENT_TURNS)]
+
+async def voice_turn(pipeline, audio_data, waveform_slot):
+    """Recording turn: waveform rendering and the Murf connection overlap speech-to-text"""
+    waveform = pipeline.background("waveform", plot_waveform, audio_data)
+    pipeline.background("tts_connect", get_murf_client().warm_up)
+    stt = asyncio.ensure_future(pipeline.run("stt", transcribe_audio, audio_data))
     
-    for msg in st.session_state.messages:
-        role = "You" if msg["role"] == "user" else "Assistant"
-        export_text += f"{role}:\n{msg['content']}\n\n"
+    with waveform_slot.container():
+        show_waveform(await waveform)
+    transcript = await stt
+    if not transcript:
+        return transcript, None, {}
     
-    return export_text
+    get_conversation().append({"role": "user", "content": transcript})
+    response_text, timings = pipeline.run_inline("respond", respond, conversation_for_ai())
+    return transcript, response_text, timings
+
+async def text_turn(pipeline, user_input):
+    """Typed turn: the Murf connection is opened while Gemini generates"""
+    pipeline.background("tts_connect", get_murf_client().warm_up)
+    get_conversation().append({"role": "user", "content": user_input})
+    return pipeline.run_inline("respond", respond, conversation_for_ai())
+
+# Number of history messages rendered per page
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "20"))
+
+def history_html(messages):
+    """One HTML block for a window of messages, built from memoized bubbles"""
+    return "".join(
+        cached_message_html(
+            message["role"],
+            message["content"],
+            f"⏱️ {format_timings(message['timings'])}" if message.get("timings") else ""
+        )
+        for message in messages
+    )
+
+@st.fragment
+def conversation_history():
+    """Render the most recent window of the conversation; reruns on its own when paging"""
+    conversation = get_conversation()
+    if not conversation:
+        st.info("👋 Welcome! Record audio or type a message to start chatting.")
+        return
+    
+    shown = min(len(conversation), st.session_state.history_window)
+    if shown < len(conversation):
+        if st.button(f"⬆️ Load earlier messages ({len(conversation) - shown} hidden)", key="load_earlier"):
+            st.session_state.history_window += HISTORY_PAGE_SIZE
+            st.rerun(scope="fragment")
+    
+    # A single markdown element for the whole window instead of one per message
+    st.markdown(history_html(conversation.recent(shown)), unsafe_allow_html=True)
+    
+    if st.button("🗑️ Clear Chat"):
+        conversation.clear()
+        st.session_state.history_window = HISTORY_PAGE_SIZE
+        get_chat_memory().clear()
+        st.rerun()
 
 # Available Murf voices
 MURF_VOICES = {
@@ -287,181 +1080,309 @@ MURF_VOICES = {
     "Daniel (UK Male)": "en-UK-daniel",
 }
 
-# Initialize session state
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+def init_session_state():
+    """Per-session defaults, set once on the session's first run"""
+    if "conversation" not in st.session_state:
+        # The session id lives in the URL so a reload (or a server restart) resumes the chat
+        session_id = st.query_params.get("sid")
+        if not is_valid_session_id(session_id):
+            session_id = uuid.uuid4().hex
+        st.query_params["sid"] = session_id
+        st.session_state.conversation = Conversation(
+            get_conversation_store(), session_id, hot_window=CONVERSATION_HOT_WINDOW
+        )
+
+    if "selected_voice" not in st.session_state:
+        st.session_state.selected_voice = "en-US-ken"
 
-if "selected_voice" not in st.session_state:
-    st.session_state.selected_voice = "en-US-ken"
+    if "tts_profile" not in st.session_state:
+        st.session_state.tts_profile = TTS_PROFILE if TTS_PROFILE in TTS_PROFILES else TTS_PROFILE_AUTO
 
-if "last_audio" not in st.session_state:
-    st.session_state.last_audio = None
+    if "last_audio_id" not in st.session_state:
+        st.session_state.last_audio_id = None
 
-if "show_waveform" not in st.session_state:
-    st.session_state.show_waveform = False
+    if "show_waveform" not in st.session_state:
+        st.session_state.show_waveform = False
 
-# Header
-st.title("🎙️ Voice Chat with Murf AI")
+    if "pipelined_tts" not in st.session_state:
+        st.session_state.pipelined_tts = os.getenv("TTS_PIPELINED", "1") != "0"
+
+    if "history_window" not in st.session_state:
+        st.session_state.history_window = HISTORY_PAGE_SIZE
+
+    if "stream_llm" not in st.session_state:
+        st.session_state.stream_llm = os.getenv("LLM_STREAMING", "1") != "0"
+
+def status_panel():
+    """API, cache and latency status for the sidebar"""
+    st.markdown("### 📊 Status")
 
-# Sidebar for settings
-with st.sidebar:
+    gemini_status = "✅ Connected" if os.getenv("GOOGLE_API_KEY") else "❌ Not configured"
+    murf_status = "✅ Connected" if os.getenv("MURF_API_KEY") else "❌ Not configured"
+
+    st.markdown(f"**Gemini AI:** {gemini_status}")
+    st.markdown(f"**Murf API:** {murf_status}")
+
+    tts_stats = get_tts_cache().stats()
+    st.markdown(
+        f"**TTS cache:** {tts_stats['hits']} hits / {tts_stats['misses']} misses "
+        f"({tts_stats['hit_rate']:.0%}), {tts_stats['evictions']} evictions"
+    )
+    transcript_stats = get_transcript_cache().stats()
+    if transcript_stats["hits"] or transcript_stats["writes"]:
+        st.markdown(
+            f"**Transcript cache:** {transcript_stats['hits']} hits / {transcript_stats['misses']} misses "
+            f"({transcript_stats['hit_rate']:.0%})"
+        )
+    stt_counters = get_stt_counters()
+    if stt_counters["calls"]:
+        saved = 1 - stt_counters["upload_bytes"] / max(stt_counters["source_bytes"], 1)
+        st.markdown(
+            f"**STT uploads:** {stt_counters['calls']} calls, "
+            f"{stt_counters['upload_bytes'] / 1024:.0f} KB sent ({saved:.0%} saved), "
+            f"avg {stt_counters['stt_s'] / stt_counters['calls']:.2f}s, "
+            f"{stt_counters['uploaded_s']:.0f}s of {stt_counters['recorded_s']:.0f}s recorded"
+        )
+    if st.session_state.get("last_stt"):
+        last_stt = st.session_state.last_stt
+        st.caption(
+            f"Last upload: {last_stt['source_bytes'] / 1024:.0f} KB → {last_stt['upload_bytes'] / 1024:.0f} KB "
+            f"({last_stt['sample_rate'] // 1000} kHz, {last_stt['channels']} ch), {last_stt['stt_s']:.2f}s"
+        )
+        if "trimmed_ratio" in last_stt:
+            st.caption(
+                f"Silence trimmed: {last_stt['original_s']:.1f}s → {last_stt['trimmed_s']:.1f}s "
+                f"({last_stt['trimmed_ratio']:.0%})"
+            )
+
+    murf_stats = get_murf_client().stats()
+    if murf_stats["calls"]:
+        st.markdown(
+            f"**Murf calls:** {murf_stats['calls']} in {murf_stats['round_trips']} round-trips, "
+            f"{murf_stats['connections_opened']} connections, avg {murf_stats['avg_seconds']:.2f}s"
+        )
+
+    profile_stats = get_tts_profile_stats()
+    with profile_stats["lock"]:
+        profiles = {name: dict(totals) for name, totals in profile_stats["profiles"].items()}
+    for name, totals in profiles.items():
+        rate = f"{totals['bytes'] / totals['audio_s'] / 1024:.1f} KB/s of speech" if totals["audio_s"] else "duration n/a"
+        st.caption(
+            f"{name}: {totals['calls']} calls, {rate}, "
+            f"avg request {totals['request_s'] / totals['calls']:.2f}s, "
+            f"download {totals['download_s'] / totals['calls']:.2f}s"
+        )
+
+    for provider, gate in get_provider_gates().items():
+        gate_stats = gate.stats()
+        if gate_stats["calls"] or gate_stats["coalesced"]:
+            st.caption(
+                f"{provider}: {gate_stats['calls']} requests, {gate_stats['coalesced']} coalesced, "
+                f"{gate_stats['throttled']} throttled, {gate_stats['waiting']} queued now, "
+                f"avg wait {gate_stats['queued_s'] / max(gate_stats['calls'], 1):.2f}s"
+            )
+
+    snapshot = get_metrics().snapshot()
+    if snapshot:
+        with st.expander("⏱️ Stage latency"):
+            st.markdown(metrics_table(snapshot))
+            if get_audio_server():
+                st.caption(f"Prometheus metrics: {get_audio_server().local_url}/metrics")
+
+@st.fragment
+@timed("fragment_sidebar")
+def sidebar():
+    """Settings, status and export; changing a setting reruns only the sidebar"""
     st.markdown("### ⚙️ Settings")
-    
+
     selected_voice_name = st.selectbox(
         "Select Voice",
         options=list(MURF_VOICES.keys()),
         index=0
     )
     st.session_state.selected_voice = MURF_VOICES[selected_voice_name]
-    
+
+    st.selectbox(
+        "Audio quality",
+        options=[TTS_PROFILE_AUTO] + list(TTS_PROFILES),
+        key="tts_profile",
+        help="Auto uses hi-fi for short replies and smaller formats for long or streamed ones"
+    )
+
+    st.toggle(
+        "Stream speech by sentence",
+        key="pipelined_tts",
+        help="Start playback as soon as the first sentence is synthesized"
+    )
+    st.toggle(
+        "Stream responses",
+        key="stream_llm",
+        help="Show the reply token by token while Gemini generates it"
+    )
+
     st.markdown("---")
-    st.markdown("### 📊 Status")
-    
-    gemini_status = "✅ Connected" if os.getenv("GOOGLE_API_KEY") else "❌ Not configured"
-    murf_status = "✅ Connected" if os.getenv("MURF_API_KEY") else "❌ Not configured"
-    
-    st.markdown(f"**Gemini AI:** {gemini_status}")
-    st.markdown(f"**Murf API:** {murf_status}")
-    
+    status_panel()
     st.markdown("---")
-    
-    if st.session_state.messages:
-        st.markdown("### 💾 Export")
-        export_text = export_conversation()
-        if export_text:
-            st.download_button(
-                label="📥 Download Chat",
-                data=export_text,
-                file_name="voice_chat_conversation.txt",
-                mime="text/plain"
-            )
 
-st.markdown("---")
+    if get_conversation():
+        export_panel()
 
-# Main interface
-col1, col2 = st.columns([1, 1])
+def request_turn(kind):
+    """Run a turn on a full rerun, so the reply, playback and history all update in one pass"""
+    st.session_state.requested_turn = kind
+    st.rerun()
 
-with col1:
+def take_turn_request(kind):
+    """Whether a ``kind`` turn was requested; consumes the request"""
+    if st.session_state.get("requested_turn") != kind:
+        return False
+    del st.session_state.requested_turn
+    return True
+
+@st.fragment
+@timed("fragment_recorder")
+def recorder_panel():
+    """Recorder with preview; recording reruns only this panel until the turn is processed"""
     st.markdown("### 🎤 Record Audio")
     audio = audiorecorder("Click to record", "Recording... Click to stop")
-    
-    if len(audio) > 0:
-        st.audio(audio.export().read())
-        
+    turn_requested = take_turn_request("voice")
+
+    if len(audio) == 0:
+        return
+    st.audio(audio.export().read())
+
+    # Waveform slot; filled by the turn pipeline when processing
+    waveform_slot = st.empty()
+
+    if st.button("🎯 Process Audio", key="process_audio"):
+        request_turn("voice")
+
+    if not turn_requested:
         # Display waveform
-        waveform_fig = plot_waveform(audio)
-        if waveform_fig:
-            st.pyplot(waveform_fig)
-            plt.close(waveform_fig)
-        
-        if st.button("🎯 Process Audio", key="process_audio"):
-            # Transcribe audio
-            transcript = transcribe_audio(audio)
-            
-            if transcript:
-                # Add user message
-                st.session_state.messages.append({"role": "user", "content": transcript})
-                
-                # Get AI response
-                ai_messages = [{"role": msg["role"], "content": msg["content"]} 
-                              for msg in st.session_state.messages]
-                
-                response_text = get_ai_response(ai_messages)
-                
-                if response_text:
-                    # Add assistant message
-                    st.session_state.messages.append({"role": "assistant", "content": response_text})
-                    
-                    # Convert to speech and store
-                    audio_content = call_murf_tts(response_text, st.session_state.selected_voice)
-                    if audio_content:
-                        st.session_state.last_audio = audio_content
-                        st.session_state.show_waveform = True
-                
-                st.rerun()
-
-with col2:
+        with waveform_slot.container():
+            show_waveform(plot_waveform(audio))
+        return
+
+    # Transcribe, respond and speak as one overlapped turn
+    pipeline = start_turn()
+    transcript, response_text, timings = pipeline.execute(voice_turn, audio, waveform_slot) or (None, None, {})
+
+    if transcript:
+        if response_text:
+            # Add assistant message
+            timings["stages"] = dict(pipeline.timings)
+            add_assistant_message(response_text, timings)
+
+        # Pipelined playback lives in this run's page, so don't rerun it away
+        if not (response_text and st.session_state.pipelined_tts):
+            st.rerun()
+
+@st.fragment
+@timed("fragment_text_input")
+def text_panel():
+    """Text box and send button; typing reruns only this panel"""
     st.markdown("### ✍️ Text Input")
     user_input = st.text_input("Type your message:", key="text_input", label_visibility="collapsed", placeholder="Type your message here...")
-    
-    if st.button("💬 Send Message", key="send_text"):
-        if user_input.strip():
-            # Add user message
-            st.session_state.messages.append({"role": "user", "content": user_input})
-            
-            # Get AI response
-            ai_messages = [{"role": msg["role"], "content": msg["content"]} 
-                          for msg in st.session_state.messages]
-            
-            response_text = get_ai_response(ai_messages)
-            
-            if response_text:
-                # Add assistant message
-                st.session_state.messages.append({"role": "assistant", "content": response_text})
-                
-                # Convert to speech and store
-                audio_content = call_murf_tts(response_text, st.session_state.selected_voice)
-                if audio_content:
-                    st.session_state.last_audio = audio_content
-                    st.session_state.show_waveform = True
-            else:
-                # If AI response failed, add error message
-                st.session_state.messages.append({"role": "assistant", "content": "I apologize, but I encountered an error generating a response. Please try again."})
-            
-            st.rerun()
 
-st.markdown("---")
+    if st.button("💬 Send Message", key="send_text") and user_input.strip():
+        request_turn("text")
+
+    if not take_turn_request("text") or not user_input.strip():
+        return
 
-# Audio playback section
-if st.session_state.last_audio:
+    # Respond and speak as one turn
+    pipeline = start_turn()
+    response_text, timings = pipeline.execute(text_turn, user_input) or (None, {})
+
+    if response_text:
+        # Add assistant message
+        timings["stages"] = dict(pipeline.timings)
+        add_assistant_message(response_text, timings)
+    else:
+        # If AI response failed, add error message
+        add_assistant_message("I apologize, but I encountered an error generating a response. Please try again.")
+
+    # Pipelined playback lives in this run's page, so don't rerun it away
+    if not (response_text and st.session_state.pipelined_tts):
+        st.rerun()
+
+def reply_playback():
+    """Latest reply audio and its waveform"""
+    # Reply audio is held by reference; the browser fetches it by URL from the audio
+    # store, so the bytes are not pushed through the Streamlit delta stream on reruns
+    last_audio_id = st.session_state.last_audio_id
+    reply_audio_src = reply_audio_url(last_audio_id) if last_audio_id else None
+    if last_audio_id and not reply_audio_src:
+        # No audio server or no public URL for it: send the bytes inline
+        reply_audio_src = get_reply_audio_store().get(last_audio_id)
+    if not reply_audio_src:
+        return
     st.markdown("### 🔊 Assistant Response Audio")
-    st.audio(st.session_state.last_audio, format="audio/mp3")
-    
+    st.audio(reply_audio_src, format="audio/mp3")
+
     # Show waveform for TTS audio if requested
     if st.session_state.show_waveform:
         try:
-            # Load MP3 audio using pydub
-            from pydub import AudioSegment
-            audio_segment = AudioSegment.from_mp3(BytesIO(st.session_state.last_audio))
-            
-            # Create waveform
-            waveform_fig = plot_waveform(audio_segment)
-            if waveform_fig:
-                st.pyplot(waveform_fig)
-                plt.close(waveform_fig)
-            
+            # Decode the MP3 and create waveform (both cached by content hash)
+            reply_audio = get_reply_audio_store().get(last_audio_id)
+            show_waveform(cached_mp3_waveform(last_audio_id, reply_audio, WAVEFORM_FORMAT))
+
             # Reset flag
             st.session_state.show_waveform = False
         except Exception as e:
             st.warning(f"Could not display waveform: {str(e)}")
 
-st.markdown("---")
-
-# Conversation History
-st.markdown("### 💬 Conversation History")
-
-if st.session_state.messages:
-    for idx, message in enumerate(st.session_state.messages):
-        if message["role"] == "user":
-            st.markdown(f"""
-                <div class="chat-message user-message">
-                    <div class="message-label">You</div>
-                    <div class="message-content">{message["content"]}</div>
-                </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.markdown(f"""
-                <div class="chat-message assistant-message">
-                    <div class="message-label">Assistant</div>
-                    <div class="message-content">{message["content"]}</div>
-                </div>
-            """, unsafe_allow_html=True)
-    
-    if st.button("🗑️ Clear Chat"):
-        st.session_state.messages = []
-        st.rerun()
-else:
-    st.info("👋 Welcome! Record audio or type a message to start chatting.")
+def main():
+    """Render the voice chat page.
+
+    Widget interactions rerun only the fragment that owns the widget (sidebar,
+    recorder, text input, history, export); a full rerun happens when a turn is
+    processed, so the reply, playback and history update together.
+    """
+    st.set_page_config(
+        page_title="Voice Chat with Murf AI",
+        page_icon="🎙️",
+        layout="centered"
+    )
+    st.markdown(compact_css(APP_CSS), unsafe_allow_html=True)
+
+    init_session_state()
+
+    # Header
+    st.title("🎙️ Voice Chat with Murf AI")
+
+    # Sidebar for settings
+    with st.sidebar:
+        sidebar()
+
+    st.markdown("---")
+
+    # Main interface
+    col1, col2 = st.columns([1, 1])
+
+    with col1:
+        recorder_panel()
+
+    with col2:
+        text_panel()
+
+    st.markdown("---")
+
+    # Audio playback section
+    reply_playback()
+
+    st.markdown("---")
+
+    # Conversation History
+    st.markdown("### 💬 Conversation History")
+    conversation_history()
+
+    st.markdown("---")
+    st.markdown("<p style='text-align: center; color: #6b7280; font-size: 0.875rem;'>Powered by Google Gemini AI & Murf Falcon TTS API</p>", unsafe_allow_html=True)
+    record_script_run()
+
 
-st.markdown("---")
-st.markdown("<p style='text-align: center; color: #6b7280; font-size: 0.875rem;'>Powered by Google Gemini AI & Murf Falcon TTS API</p>", unsafe_allow_html=True)
+# Streamlit runs this file as __main__; importing it (benchmarks, batch jobs)
+# only defines the pipeline functions
+if __name__ == "__main__":
+    main()
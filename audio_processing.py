@@ -0,0 +1,58 @@
+"""Audio preparation helpers for the speech-to-text upload path."""
+import threading
+from io import BytesIO
+
+# Gemini transcribes speech just as well at 16 kHz mono, at a fraction of the bytes
+STT_SAMPLE_RATE = 16000
+STT_CHANNELS = 1
+STT_SAMPLE_WIDTH = 2
+
+_WAV_HEADER_BYTES = 44
+
+_local = threading.local()
+
+
+def _reusable_buffer():
+    """Per-thread BytesIO that is reset and reused instead of reallocated per call"""
+    buffer = getattr(_local, "buffer", None)
+    if buffer is None:
+        buffer = _local.buffer = BytesIO()
+    buffer.seek(0)
+    buffer.truncate(0)
+    return buffer
+
+
+def normalize_for_stt(segment):
+    """Resample a pydub segment to 16 kHz, 16-bit mono"""
+    if segment.channels != STT_CHANNELS:
+        segment = segment.set_channels(STT_CHANNELS)
+    if segment.sample_width != STT_SAMPLE_WIDTH:
+        segment = segment.set_sample_width(STT_SAMPLE_WIDTH)
+    if segment.frame_rate != STT_SAMPLE_RATE:
+        segment = segment.set_frame_rate(STT_SAMPLE_RATE)
+    return segment
+
+
+def export_wav_bytes(segment, normalize=True):
+    """Encode a pydub segment as WAV in memory, without touching the disk.
+
+    Returns ``(wav_bytes, stats)`` where stats holds the size the recording
+    would have had at its original format (``source_bytes``), the bytes that
+    will actually be uploaded (``upload_bytes``) and the resulting format.
+    """
+    source_bytes = len(segment.raw_data) + _WAV_HEADER_BYTES
+    if normalize:
+        segment = normalize_for_stt(segment)
+
+    buffer = _reusable_buffer()
+    segment.export(buffer, format="wav")
+    wav_bytes = buffer.getvalue()
+
+    stats = {
+        "source_bytes": source_bytes,
+        "upload_bytes": len(wav_bytes),
+        "sample_rate": segment.frame_rate,
+        "channels": segment.channels,
+        "duration_s": segment.duration_seconds,
+    }
+    return wav_bytes, stats
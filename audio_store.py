@@ -0,0 +1,220 @@
+"""Content-addressed reply audio served over HTTP.
+
+Each synthesized reply is written to disk once under its SHA-256 and served by
+URL from a small threaded HTTP server with Range and conditional-request
+support, so the browser downloads it once and caches it instead of receiving it
+again through the Streamlit delta stream on every rerun.
+"""
+import hashlib
+import mmap
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_AUDIO_ID = re.compile(r"^[0-9a-f]{64}$")
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def audio_id_for(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class AudioStore:
+    """Directory of ``<sha256>.mp3`` files, evicted by age and total size.
+
+    The directory is scanned once at startup; after that the store tracks each
+    file's age and size itself, so eviction never has to list the directory.
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024, max_age_s=24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # audio id -> (mtime, size), least recently written first
+        self._files = OrderedDict()
+        self._total = 0
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            audio_id = entry.name[:-4]
+            if not entry.name.endswith(".mp3") or not _AUDIO_ID.match(audio_id):
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, audio_id, stat.st_size))
+        with self._lock:
+            for mtime, audio_id, size in sorted(entries):
+                self._files[audio_id] = (mtime, size)
+                self._total += size
+        self.evict()
+
+    def path(self, audio_id):
+        if not _AUDIO_ID.match(audio_id or ""):
+            raise ValueError(f"invalid audio id: {audio_id!r}")
+        return os.path.join(self.directory, f"{audio_id}.mp3")
+
+    def put(self, audio_id, data):
+        """Write audio once; writing the same content again only refreshes its age"""
+        path = self.path(audio_id)
+        if os.path.exists(path):
+            os.utime(path)
+        else:
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        with self._lock:
+            previous = self._files.pop(audio_id, None)
+            if previous is not None:
+                self._total -= previous[1]
+            self._files[audio_id] = (time.time(), len(data))
+            self._total += len(data)
+        self.evict()
+        return audio_id
+
+    def add(self, data):
+        """Store audio and return its content id"""
+        return self.put(audio_id_for(data), data)
+
+    def get(self, audio_id):
+        try:
+            with open(self.path(audio_id), "rb") as f:
+                return f.read()
+        except (OSError, ValueError):
+            return None
+
+    def evict(self):
+        """Drop files older than max_age_s, then the oldest until under max_bytes"""
+        cutoff = time.time() - self.max_age_s
+        with self._lock:
+            while self._files:
+                audio_id, (mtime, size) = next(iter(self._files.items()))
+                if mtime >= cutoff and self._total <= self.max_bytes:
+                    break
+                del self._files[audio_id]
+                self._total -= size
+                self._remove(self.path(audio_id))
+
+    def _remove(self, path):
+        try:
+            os.unlink(path)
+            self.evictions += 1
+        except OSError:
+            pass
+
+
+def _handler_for(store, metrics_text=None):
+    class AudioRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_HEAD(self):
+            self._serve(send_body=False)
+
+        def do_GET(self):
+            self._serve(send_body=True)
+
+        def _serve(self, send_body):
+            if metrics_text is not None and self.path.split("?", 1)[0] == "/metrics":
+                self._serve_metrics(send_body)
+                return
+            name = self.path.split("?", 1)[0].rsplit("/", 1)[-1]
+            audio_id = name[:-4] if name.endswith(".mp3") else name
+            try:
+                path = store.path(audio_id)
+                f = open(path, "rb")
+            except (OSError, ValueError):
+                self.send_error(404)
+                return
+            with f:
+                size = os.fstat(f.fileno()).st_size
+                etag = f'"{audio_id}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                start, end = 0, size - 1
+                status = 200
+                match = _RANGE.match(self.headers.get("Range", ""))
+                if match and size:
+                    first, last = match.groups()
+                    if first:
+                        start = int(first)
+                        end = min(int(last), size - 1) if last else size - 1
+                    elif last:
+                        start = max(size - int(last), 0)
+                    if start > end or start >= size:
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{size}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    status = 206
+
+                self.send_response(status)
+                self.send_header("Content-Type", "audio/mpeg")
+                self.send_header("Accept-Ranges", "bytes")
+                # Content-addressed, so the URL's bytes can never change
+                self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+                self.send_header("ETag", etag)
+                if status == 206:
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                self.send_header("Content-Length", str(end - start + 1 if size else 0))
+                self.end_headers()
+                if send_body and size:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        self.wfile.write(mapped[start:end + 1])
+
+        def _serve_metrics(self, send_body):
+            body = metrics_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Cache-Control", "no-store")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+
+    return AudioRequestHandler
+
+
+class AudioServer:
+    """Serves an AudioStore at ``<base_url>/audio/<id>.mp3`` from a daemon thread.
+
+    The server listens on loopback by default. Browsers are only given URLs
+    when ``public_url`` says how they reach it (e.g. through a reverse proxy
+    on the page's own origin); without it ``url`` returns None and callers
+    send the audio inline. If ``metrics_text`` is given, its output is also
+    served at ``/metrics``.
+    """
+
+    def __init__(self, store, host="127.0.0.1", port=8502, public_url=None, metrics_text=None):
+        self.store = store
+        self._server = ThreadingHTTPServer((host, port), _handler_for(store, metrics_text))
+        self._server.daemon_threads = True
+        self.local_url = f"http://{host}:{self._server.server_address[1]}"
+        self.public_url = public_url.rstrip("/") if public_url else None
+        self._thread = threading.Thread(target=self._server.serve_forever, name="audio-server", daemon=True)
+        self._thread.start()
+
+    def url(self, audio_id):
+        """Browser URL for the audio, or None when no public URL is configured"""
+        if not self.public_url:
+            return None
+        return f"{self.public_url}/audio/{audio_id}.mp3"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,241 @@
+"""Batch processing of audio files and text prompts through the voice pipeline.
+
+Each item is transcribed (audio only), answered by Gemini and synthesized by
+Murf on a bounded thread pool. Provider calls go through shared token-bucket
+rate limiters, finished items are appended to a checkpoint so an interrupted
+run can be resumed, and every item's transcript, reply, audio and timings are
+written to the output directory along with a summary report.
+"""
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from metrics import quantile
+from rate_limit import RateLimiter
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".ogg", ".webm", ".m4a", ".flac")
+TEXT_EXTENSIONS = (".txt",)
+
+STAGES = ("load", "stt", "llm", "tts", "total")
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def safe_name(item_id):
+    """File-system safe output name for an item id.
+
+    A short hash of the original id is appended, so ids that only differ in
+    characters the sanitising replaces ("a/b" and "a_b") never share outputs.
+    """
+    digest = hashlib.sha1(item_id.encode("utf-8")).hexdigest()[:8]
+    return f"{_UNSAFE.sub('_', item_id).strip('._') or 'item'}-{digest}"
+
+
+def _read_text(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def items_from_directory(directory):
+    """Audio and .txt prompt files under ``directory``, ids are relative paths without extension"""
+    items = []
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            item_id = os.path.splitext(os.path.relpath(path, directory))[0].replace(os.sep, "/")
+            extension = os.path.splitext(name)[1].lower()
+            if extension in AUDIO_EXTENSIONS:
+                items.append({"id": item_id, "audio": path})
+            elif extension in TEXT_EXTENSIONS:
+                items.append({"id": item_id, "text": _read_text(path)})
+    return sorted(items, key=lambda item: item["id"])
+
+
+def items_from_manifest(path):
+    """Items from a JSONL or CSV manifest with ``id``, ``audio`` and/or ``text`` fields.
+
+    Relative audio paths are resolved against the manifest's directory.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+    items = []
+    for number, row in enumerate(rows, 1):
+        item = {"id": str(row.get("id") or number)}
+        if row.get("audio"):
+            item["audio"] = os.path.join(base, row["audio"])
+        elif row.get("text"):
+            item["text"] = row["text"]
+        else:
+            raise ValueError(f"{path}: entry {number} has neither 'audio' nor 'text'")
+        items.append(item)
+    return items
+
+
+def load_items(source):
+    if os.path.isdir(source):
+        return items_from_directory(source)
+    return items_from_manifest(source)
+
+
+class Checkpoint:
+    """Append-only JSONL log of finished items; reruns skip what it already holds"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.results = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        result = json.loads(line)
+                        self.results[result["id"]] = result
+        except FileNotFoundError:
+            pass
+
+    def done(self, item_id):
+        result = self.results.get(item_id)
+        return result is not None and result["status"] != "error"
+
+    def record(self, result):
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+            self.results[result["id"]] = result
+
+
+class BatchRunner:
+    """Runs items through STT → LLM → TTS with bounded concurrency and shared rate limits"""
+
+    def __init__(self, output_dir, workers=4, gemini_rps=2.0, murf_rps=2.0, voice_id="en-US-ken"):
+        import app
+        self.app = app
+        self.output_dir = output_dir
+        self.workers = workers
+        self.voice_id = voice_id
+        self.limits = {"gemini": RateLimiter(gemini_rps), "murf": RateLimiter(murf_rps)}
+        os.makedirs(os.path.join(output_dir, "items"), exist_ok=True)
+        self.checkpoint = Checkpoint(os.path.join(output_dir, "checkpoint.jsonl"))
+
+    def _call(self, provider, timings, stage, func, *args):
+        queued = time.perf_counter()
+        self.limits[provider].acquire()
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            timings["queued_s"] = timings.get("queued_s", 0.0) + started - queued
+            timings[f"{stage}_s"] = time.perf_counter() - started
+
+    def process(self, item):
+        """Run one item; never raises, failures are reported in the result"""
+        from chat_memory import ChatMemory
+        from pydub import AudioSegment
+
+        app = self.app
+        started = time.perf_counter()
+        timings = {}
+        result = {"id": item["id"], "status": "ok", "timings": timings}
+        try:
+            prompt = item.get("text")
+            if "audio" in item:
+                load_started = time.perf_counter()
+                recording = AudioSegment.from_file(item["audio"])
+                timings["load_s"] = time.perf_counter() - load_started
+                # Fixture audio seen before skips the rate limiter and the upload
+                prompt = app.cached_transcript(recording)
+                if prompt is None:
+                    prompt, _ = self._call("gemini", timings, "stt", app.transcribe_recording, recording, False)
+                else:
+                    result["transcript_cached"] = True
+                result["transcript"] = prompt
+                if not prompt:
+                    result["status"] = "no_speech"
+                    return result
+
+            memory = ChatMemory(token_budget=app.CHAT_TOKEN_BUDGET, max_recent_turns=app.CHAT_RECENT_TURNS)
+            reply = self._call("gemini", timings, "llm", app.generate_reply, prompt, memory, timings)
+            if not reply:
+                raise RuntimeError("Gemini returned an empty reply")
+            result["reply"] = reply
+
+            audio = self._call("murf", timings, "tts", app.synthesize_speech, reply, self.voice_id)
+            name = safe_name(item["id"])
+            audio_path = os.path.join(self.output_dir, "items", f"{name}.mp3")
+            with open(audio_path, "wb") as f:
+                f.write(audio)
+            result["audio"] = os.path.relpath(audio_path, self.output_dir)
+            result["audio_bytes"] = len(audio)
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            timings["total_s"] = time.perf_counter() - started
+            details_path = os.path.join(self.output_dir, "items", f"{safe_name(item['id'])}.json")
+            with open(details_path, "w", encoding="utf-8") as f:
+                json.dump(dict(result, input=item), f, ensure_ascii=False, indent=2)
+        return result
+
+    def run(self, items, log=sys.stderr):
+        """Process every item not already in the checkpoint; returns the report"""
+        pending = [item for item in items if not self.checkpoint.done(item["id"])]
+        skipped = len(items) - len(pending)
+        print(f"{len(pending)} items to process, {skipped} already done", file=log)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch") as pool:
+            futures = [pool.submit(self.process, item) for item in pending]
+            for done, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                self.checkpoint.record(result)
+                print(
+                    f"[{done}/{len(pending)}] {result['id']}: {result['status']} "
+                    f"in {result['timings']['total_s']:.2f}s" + (f" ({result['error']})" if "error" in result else ""),
+                    file=log,
+                )
+        wall_s = time.perf_counter() - started
+
+        report = build_report([self.checkpoint.results[item["id"]] for item in items if item["id"] in self.checkpoint.results])
+        report.update(
+            processed=len(pending),
+            skipped=skipped,
+            wall_s=wall_s,
+            items_per_s=len(pending) / wall_s if wall_s else None,
+            rate_limit_wait_s={name: limiter.waited_s for name, limiter in self.limits.items()},
+        )
+        with open(os.path.join(self.output_dir, "report.json"), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return report
+
+
+def build_report(results):
+    """Status counts and per-stage latency percentiles over item results"""
+    statuses = {}
+    for result in results:
+        statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+    stages = {}
+    for stage in STAGES + ("queued",):
+        values = sorted(result["timings"][f"{stage}_s"] for result in results if f"{stage}_s" in result["timings"])
+        if values:
+            stages[stage] = {
+                "count": len(values),
+                "p50_s": quantile(values, 0.50),
+                "p95_s": quantile(values, 0.95),
+                "p99_s": quantile(values, 0.99),
+                "max_s": values[-1],
+            }
+    items = [
+        {key: result[key] for key in ("id", "status", "timings", "error", "audio_bytes") if key in result}
+        for result in results
+    ]
+    return {"items": len(results), "statuses": statuses, "stages": stages, "results": items}
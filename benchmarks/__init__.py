@@ -0,0 +1 @@
+"""Offline benchmarks for the voice chat pipeline."""
@@ -0,0 +1,209 @@
+"""Offline latency benchmark for the voice chat pipeline.
+
+Runs the app's own ``transcribe_audio``, ``get_ai_response``, ``call_murf_tts``
+and ``plot_waveform`` against local stand-in Murf and Gemini servers and prints
+one JSON document with p50/p95/p99 per stage, bytes transferred and peak RSS,
+so runs on different commits can be diffed directly::
+
+    python -m benchmarks.bench_pipeline --iterations 50 --output bench.json
+    python -m benchmarks.bench_pipeline --murf-latency-ms 300 --murf-audio-kb 256 --no-inline-audio
+
+Every iteration uses fresh audio and reply text, so the TTS, waveform and
+Streamlit caches never short-circuit a stage.
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from pydub import AudioSegment
+
+from benchmarks.fake_servers import FakeGeminiServer, FakeMurfServer, Latency
+
+STAGES = ("stt", "llm", "tts", "waveform")
+
+
+def percentile(values, q):
+    """Linearly interpolated percentile of ``values`` (0 <= q <= 100)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(samples):
+    """Latency summary in milliseconds"""
+    ms = [value * 1000 for value in samples]
+    return {
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "p99_ms": percentile(ms, 99),
+        "mean_ms": sum(ms) / len(ms) if ms else None,
+        "max_ms": max(ms) if ms else None,
+    }
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def synthetic_recording(seconds, sample_rate, channels, seed):
+    """A tone with noise, shaped like a microphone recording from the browser"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    signal = 0.3 * np.sin(2 * np.pi * (180 + seed % 50) * t) + 0.05 * rng.standard_normal(t.size)
+    samples = (np.clip(signal, -1, 1) * 32767).astype("<i2")
+    if channels > 1:
+        samples = np.repeat(samples[:, None], channels, axis=1).ravel()
+    return AudioSegment(data=samples.tobytes(), sample_width=2, frame_rate=sample_rate, channels=channels)
+
+
+def _bytes_delta(before, after):
+    return {
+        "bytes_sent": after["bytes_received"] - before["bytes_received"],
+        "bytes_received": after["bytes_sent"] - before["bytes_sent"],
+    }
+
+
+def configure_environment(args, murf, gemini, workdir):
+    """Point app.py at the stand-ins; must run before app is imported"""
+    os.environ.update({
+        "GOOGLE_API_KEY": "benchmark",
+        "MURF_API_KEY": "benchmark",
+        "GEMINI_API_ENDPOINT": gemini.url,
+        "MURF_API_URL": murf.api_url,
+        "MURF_INLINE_AUDIO": "1" if args.inline_audio else "0",
+        "TTS_CACHE_DIR": os.path.join(workdir, "tts"),
+        "TRANSCRIPT_CACHE_DIR": os.path.join(workdir, "transcripts"),
+        "REPLY_AUDIO_DIR": os.path.join(workdir, "replies"),
+        "CONVERSATION_PATH": os.path.join(workdir, "conversations.sqlite3"),
+        "WAVEFORM_FORMAT": args.waveform_format,
+        # Measure the stages, not the app's provider pacing
+        "GEMINI_RPS": "1000",
+        "GEMINI_BURST": "1000",
+        "MURF_RPS": "1000",
+        "MURF_BURST": "1000",
+    })
+
+
+def run(args):
+    murf = FakeMurfServer(
+        latency=Latency(args.murf_latency_ms, args.jitter_ms, seed=1),
+        download_latency=Latency(args.murf_download_latency_ms, args.jitter_ms, seed=2),
+        audio_bytes=args.murf_audio_kb * 1024,
+    )
+    gemini = FakeGeminiServer(
+        latency=Latency(args.gemini_latency_ms, args.jitter_ms, seed=3),
+        reply_chars=args.reply_chars,
+    )
+    with tempfile.TemporaryDirectory(prefix="voice-bench-") as workdir:
+        configure_environment(args, murf, gemini, workdir)
+        app = importlib.import_module("app")
+        from chat_memory import ChatMemory
+
+        memory = ChatMemory(token_budget=app.CHAT_TOKEN_BUDGET, max_recent_turns=app.CHAT_RECENT_TURNS)
+        samples = {stage: [] for stage in STAGES}
+        errors = {stage: 0 for stage in STAGES}
+        traffic = {stage: {"bytes_sent": 0, "bytes_received": 0} for stage in STAGES}
+
+        def timed(stage, server, func, *func_args):
+            before = server.totals() if server else None
+            started = time.perf_counter()
+            result = func(*func_args)
+            elapsed = time.perf_counter() - started
+            if server:
+                for name, value in _bytes_delta(before, server.totals()).items():
+                    traffic[stage][name] += value
+            if result is None:
+                errors[stage] += 1
+            elif iteration >= args.warmup:
+                samples[stage].append(elapsed)
+            return result
+
+        started = time.perf_counter()
+        for iteration in range(args.warmup + args.iterations):
+            recording = synthetic_recording(args.audio_seconds, args.sample_rate, args.channels, seed=iteration)
+            transcript = timed("stt", gemini, app.transcribe_audio, recording)
+            message = f"{transcript or 'Hello'} (turn {iteration})"
+            reply = timed("llm", gemini, app.get_ai_response, [{"role": "user", "content": message}], None, memory)
+            # Unique text per turn so the TTS cache never answers for Murf
+            timed("tts", murf, app.call_murf_tts, f"{reply or 'Hello'} [{iteration}]")
+            timed("waveform", None, app.plot_waveform, recording)
+            del recording
+        wall_s = time.perf_counter() - started
+        # The app's own span metrics split TTS into generate/download, waveform into decode/render
+        app_stages = app.get_metrics().snapshot()
+        tts_profiles = app.get_tts_profile_stats()["profiles"]
+
+    murf.close()
+    gemini.close()
+    stages = {}
+    for stage in STAGES:
+        stages[stage] = dict(summarize(samples[stage]), count=len(samples[stage]), errors=errors[stage], **traffic[stage])
+    return {
+        "benchmark": "voice_pipeline",
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "stages": stages,
+        "app_stages": app_stages,
+        "tts_profiles": tts_profiles,
+        "servers": {"murf": murf.counters(), "gemini": gemini.counters()},
+        "wall_s": wall_s,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2, help="untimed iterations first")
+    parser.add_argument("--audio-seconds", type=float, default=5.0, help="length of each synthetic recording")
+    parser.add_argument("--sample-rate", type=int, default=48000)
+    parser.add_argument("--channels", type=int, default=2)
+    parser.add_argument("--gemini-latency-ms", type=float, default=150.0)
+    parser.add_argument("--reply-chars", type=int, default=400, help="length of the canned Gemini reply")
+    parser.add_argument("--murf-latency-ms", type=float, default=250.0)
+    parser.add_argument("--murf-download-latency-ms", type=float, default=50.0)
+    parser.add_argument("--murf-audio-kb", type=int, default=96, help="size of each synthesized reply")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="uniform extra latency per request")
+    parser.add_argument("--no-inline-audio", dest="inline_audio", action="store_false",
+                        help="fetch Murf audio by URL instead of base64 in the response")
+    parser.add_argument("--waveform-format", choices=("svg", "png"), default="svg")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
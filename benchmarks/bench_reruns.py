@@ -0,0 +1,115 @@
+"""Cold-start and rerun cost of the Streamlit page.
+
+Each cold start runs the page once in a fresh interpreter, so module imports and
+cached resources are paid from scratch. Reruns replay common interactions
+(typing in the text box, flipping a setting) in one warm process. Output is one
+JSON document, like ``bench_pipeline``::
+
+    python -m benchmarks.bench_reruns --cold-runs 5 --reruns 30 --output reruns.json
+
+AppTest re-executes the whole script for every interaction, so these numbers
+are the full-rerun cost; fragment-scoped reruns in a live session are recorded
+separately as ``fragment_*`` stages in the app's latency panel.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_pipeline import git_revision, peak_rss_bytes, summarize
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+_COLD_RUN = """
+import json, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+at.run()
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "exceptions": [str(e.value) for e in at.exception],
+                  "genai_loaded": "google.generativeai" in sys.modules,
+                  "matplotlib_loaded": "matplotlib" in sys.modules}))
+"""
+
+
+def cold_starts(runs, env):
+    """First page run in a fresh interpreter, ``runs`` times"""
+    results = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-c", _COLD_RUN, APP_PATH], capture_output=True, text=True, env=env, check=True
+        )
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return results
+
+
+def reruns(count, env):
+    """Warm reruns for each interaction, in this process"""
+    from streamlit.testing.v1 import AppTest
+
+    os.environ.update(env)
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    at.run()
+    interactions = {
+        "rerun": lambda i: at.run(),
+        "type_text": lambda i: at.text_input(key="text_input").input(f"draft message {i}").run(),
+        "toggle_setting": lambda i: at.toggle(key="stream_llm").set_value(i % 2 == 0).run(),
+    }
+    samples = {name: [] for name in interactions}
+    for i in range(count):
+        for name, interact in interactions.items():
+            started = time.perf_counter()
+            interact(i)
+            samples[name].append(time.perf_counter() - started)
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cold-runs", type=int, default=3)
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="voice-bench-") as workdir:
+        # Keep the benchmark's sessions and caches out of the real ones; no API keys needed
+        env = dict(
+            os.environ,
+            CONVERSATION_PATH=os.path.join(workdir, "conversations.sqlite3"),
+            TTS_CACHE_DIR=os.path.join(workdir, "tts"),
+            TRANSCRIPT_CACHE_DIR=os.path.join(workdir, "transcripts"),
+            REPLY_AUDIO_DIR=os.path.join(workdir, "replies"),
+            AUDIO_SERVER_PORT="0",
+        )
+        cold = cold_starts(args.cold_runs, env)
+        warm = reruns(args.reruns, env)
+
+    report = {
+        "benchmark": "streamlit_reruns",
+        "revision": git_revision(),
+        "cold_start": dict(
+            summarize([run["seconds"] for run in cold]),
+            count=len(cold),
+            exceptions=sorted({error for run in cold for error in run["exceptions"]}),
+            heavy_modules_loaded={
+                "google.generativeai": any(run["genai_loaded"] for run in cold),
+                "matplotlib": any(run["matplotlib_loaded"] for run in cold),
+            },
+        ),
+        "reruns": {name: dict(summarize(values), count=len(values)) for name, values in warm.items()},
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
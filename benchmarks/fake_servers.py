@@ -0,0 +1,178 @@
+"""Local stand-ins for the Murf and Gemini HTTP APIs.
+
+Both servers answer with canned payloads of a configurable size after a
+configurable delay, and count the bytes they receive and send, so the app's
+client code can be benchmarked end to end without network access or API keys.
+"""
+import base64
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Latency:
+    """Fixed delay plus uniform jitter, in milliseconds"""
+
+    def __init__(self, base_ms=0.0, jitter_ms=0.0, seed=0):
+        self.base_ms = base_ms
+        self.jitter_ms = jitter_ms
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sleep(self):
+        with self._lock:
+            jitter = self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+        delay = (self.base_ms + jitter) / 1000
+        if delay > 0:
+            time.sleep(delay)
+
+
+class _FakeServer:
+    """ThreadingHTTPServer on an ephemeral port with per-endpoint byte counters"""
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self.url = f"http://{host}:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def count(self, endpoint, received=0, sent=0):
+        with self._lock:
+            counter = self._counters.setdefault(endpoint, {"requests": 0, "bytes_received": 0, "bytes_sent": 0})
+            counter["requests"] += 1
+            counter["bytes_received"] += received
+            counter["bytes_sent"] += sent
+
+    def counters(self):
+        """Snapshot of {endpoint: {requests, bytes_received, bytes_sent}}"""
+        with self._lock:
+            return {endpoint: dict(counter) for endpoint, counter in self._counters.items()}
+
+    def totals(self):
+        totals = {"requests": 0, "bytes_received": 0, "bytes_sent": 0}
+        for counter in self.counters().values():
+            for name in totals:
+                totals[name] += counter[name]
+        return totals
+
+    def respond(self, handler, method, path, body):
+        """Return (endpoint, status, content_type, body) for one request"""
+        raise NotImplementedError
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _dispatch(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                endpoint, status, content_type, payload = server.respond(self, method, self.path, body)
+                # Counted before replying so the client never sees a stale total
+                server.count(endpoint, received=len(body), sent=len(payload) if method != "HEAD" else 0)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                if method != "HEAD":
+                    self.wfile.write(payload)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_HEAD(self):
+                self._dispatch("HEAD")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+        return Handler
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _json(endpoint, data, status=200):
+    return endpoint, status, "application/json", json.dumps(data).encode("utf-8")
+
+
+class FakeMurfServer(_FakeServer):
+    """``/v1/speech/generate`` returning ``audio_bytes`` of noise, inline or by URL"""
+
+    def __init__(self, latency=None, download_latency=None, audio_bytes=64 * 1024, **kwargs):
+        self.latency = latency or Latency()
+        self.download_latency = download_latency or Latency()
+        self.audio = os.urandom(audio_bytes)
+        # Reported speech duration, as if the noise were a 128 kbps MP3
+        self.audio_seconds = round(audio_bytes / 16000, 3)
+        super().__init__(**kwargs)
+
+    @property
+    def api_url(self):
+        return f"{self.url}/v1"
+
+    def respond(self, handler, method, path, body):
+        path = path.split("?", 1)[0]
+        if method == "POST" and path == "/v1/speech/generate":
+            self.latency.sleep()
+            request = json.loads(body or b"{}")
+            if request.get("encodeAsBase64"):
+                return _json("generate", {
+                    "encodedAudio": base64.b64encode(self.audio).decode("ascii"),
+                    "audioLengthInSeconds": self.audio_seconds,
+                })
+            return _json("generate", {
+                "audioFile": f"{self.url}/audio/reply.mp3",
+                "audioLengthInSeconds": self.audio_seconds,
+            })
+        if method == "GET" and path.startswith("/audio/"):
+            self.download_latency.sleep()
+            return "download", 200, "audio/mpeg", self.audio
+        # HEAD warm-ups and anything unexpected
+        return "other", 200 if method == "HEAD" else 404, "text/plain", b""
+
+
+class FakeGeminiServer(_FakeServer):
+    """Gemini REST ``generateContent`` returning a reply of ``reply_chars`` characters"""
+
+    def __init__(self, latency=None, reply_chars=400, transcript="What is the weather like today?", **kwargs):
+        self.latency = latency or Latency()
+        self.transcript = transcript
+        sentence = "This is a canned reply from the local Gemini stand-in. "
+        self.reply = (sentence * (reply_chars // len(sentence) + 1))[:reply_chars].strip() or "OK"
+        super().__init__(**kwargs)
+
+    def respond(self, handler, method, path, body):
+        path = path.split("?", 1)[0]
+        if method != "POST" or not path.endswith(":generateContent"):
+            return _json("other", {"error": {"code": 404, "message": "not found"}}, status=404)
+        self.latency.sleep()
+        request = json.loads(body or b"{}")
+        parts = [part for content in request.get("contents", []) for part in content.get("parts", [])]
+        # Speech-to-text requests carry the recording as inline data
+        is_stt = any("inlineData" in part or "inline_data" in part for part in parts)
+        text = self.transcript if is_stt else self.reply
+        prompt_chars = sum(len(part.get("text", "")) for part in parts)
+        return _json("stt" if is_stt else "generate", {
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": text}]},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {
+                "promptTokenCount": max(1, prompt_chars // 4),
+                "candidatesTokenCount": max(1, len(text) // 4),
+                "totalTokenCount": max(1, prompt_chars // 4) + max(1, len(text) // 4),
+            },
+        })
@@ -0,0 +1,217 @@
+"""Content-addressed byte caches shared by the voice chat app.
+
+A bounded in-memory LRU tier sits in front of a size-capped on-disk tier that
+survives restarts. Values are raw bytes (MP3 audio, encoded text, ...) and keys
+are SHA-256 digests of whatever identifies the content.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def content_key(**fields):
+    """Stable SHA-256 key for a set of request fields"""
+    payload = json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by both item count and total bytes"""
+
+    def __init__(self, max_items=256, max_bytes=64 * 1024 * 1024):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._items[key] = value
+            self._bytes += len(value)
+            while self._items and (len(self._items) > self.max_items or self._bytes > self.max_bytes):
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+
+class DiskCache:
+    """Size-capped directory of content-addressed files, evicted least recently used first"""
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024, suffix=".bin"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # key -> [size, last access time]; rebuilt from the directory on start
+        self._index = {}
+        self._bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + self.suffix)
+
+    def _load_index(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(self.suffix):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                self._index[name[:-len(self.suffix)]] = [stat.st_size, stat.st_mtime]
+                self._bytes += stat.st_size
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._index:
+                return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+        except OSError:
+            with self._lock:
+                entry = self._index.pop(key, None)
+                if entry:
+                    self._bytes -= entry[0]
+            return None
+        now = time.time()
+        with self._lock:
+            if key in self._index:
+                self._index[key][1] = now
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            old = self._index.pop(key, None)
+            if old:
+                self._bytes -= old[0]
+            self._index[key] = [len(value), time.time()]
+            self._bytes += len(value)
+            self._evict_locked()
+
+    def _evict_locked(self):
+        if self._bytes <= self.max_bytes:
+            return
+        for key, (size, _) in sorted(self._index.items(), key=lambda item: item[1][1]):
+            if self._bytes <= self.max_bytes:
+                break
+            try:
+                os.unlink(self._path(key))
+            except OSError:
+                pass
+            del self._index[key]
+            self._bytes -= size
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+
+class TieredCache:
+    """Memory LRU in front of an optional disk tier, with hit/miss/eviction counters"""
+
+    def __init__(self, memory, disk=None):
+        self.memory = memory
+        self.disk = disk
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+
+    def _count(self, *names):
+        with self._lock:
+            for name in names:
+                self._counters[name] += 1
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("hits", "memory_hits")
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                # Promote so the next lookup skips the disk read
+                self.memory.put(key, value)
+                self._count("hits", "disk_hits")
+                return value
+        self._count("misses")
+        return None
+
+    def put(self, key, value):
+        if not value:
+            return
+        self.memory.put(key, value)
+        if self.disk is not None:
+            self.disk.put(key, value)
+        self._count("writes")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["memory_items"] = len(self.memory)
+        stats["memory_bytes"] = self.memory.size_bytes
+        stats["memory_evictions"] = self.memory.evictions
+        if self.disk is not None:
+            stats["disk_items"] = len(self.disk)
+            stats["disk_bytes"] = self.disk.size_bytes
+            stats["disk_evictions"] = self.disk.evictions
+        stats["evictions"] = stats["memory_evictions"] + stats.get("disk_evictions", 0)
+        return stats
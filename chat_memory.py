@@ -0,0 +1,89 @@
+"""Bounded conversation context for Gemini.
+
+Recent turns are sent verbatim; older turns are folded into a rolling summary so
+the prompt stays within a token budget no matter how long the chat runs.
+"""
+import threading
+
+# Rough characters-per-token ratio for English text; only used for budgeting
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """Cheap token estimate that needs no API call"""
+    return -(-len(text) // CHARS_PER_TOKEN) if text else 0
+
+
+def truncate_summary(summary, turns, max_chars=1200):
+    """Fallback summarizer: keep the tail of the old summary plus the dropped turns"""
+    lines = [summary] if summary else []
+    lines += [f"{turn['role']}: {turn['text']}" for turn in turns]
+    return " ".join(lines)[-max_chars:]
+
+
+class ChatMemory:
+    """Rolling summary plus a verbatim window of recent turns, kept within a token budget"""
+
+    def __init__(self, token_budget=3000, max_recent_turns=12, summarize=None):
+        self.token_budget = token_budget
+        self.max_recent_turns = max_recent_turns
+        self.summarize = summarize or truncate_summary
+        self.summary = ""
+        self.recent = []
+        self._lock = threading.Lock()
+        self._compactor = None
+
+    def _window_tokens(self):
+        return estimate_tokens(self.summary) + sum(estimate_tokens(turn["text"]) for turn in self.recent)
+
+    def build_contents(self, user_message):
+        """Gemini ``contents`` for the next request: summary, recent turns, new message"""
+        with self._lock:
+            contents = []
+            if self.summary:
+                contents.append({"role": "user", "parts": [f"Summary of our conversation so far: {self.summary}"]})
+                contents.append({"role": "model", "parts": ["Got it."]})
+            contents += [{"role": turn["role"], "parts": [turn["text"]]} for turn in self.recent]
+        contents.append({"role": "user", "parts": [user_message]})
+        return contents
+
+    def add_exchange(self, user_message, reply):
+        """Record a completed user/model exchange and compact in the background"""
+        with self._lock:
+            self.recent.append({"role": "user", "text": user_message})
+            self.recent.append({"role": "model", "text": reply})
+            needs_compaction = (
+                len(self.recent) > self.max_recent_turns or self._window_tokens() > self.token_budget
+            )
+        if needs_compaction:
+            # Summarizing may call the LLM, so keep it off the reply's critical path;
+            # the next build_contents() waits on the lock if it is still running.
+            self._compactor = threading.Thread(target=self.compact, daemon=True)
+            self._compactor.start()
+
+    def compact(self):
+        """Fold the oldest turns into the summary until the window fits the budget"""
+        with self._lock:
+            dropped = []
+            # Always keep the latest exchange verbatim
+            while len(self.recent) > 2 and (
+                len(self.recent) > self.max_recent_turns or self._window_tokens() > self.token_budget
+            ):
+                dropped += self.recent[:2]
+                self.recent = self.recent[2:]
+            if not dropped:
+                return
+            try:
+                self.summary = self.summarize(self.summary, dropped)
+            except Exception:
+                self.summary = truncate_summary(self.summary, dropped)
+
+    def prompt_tokens(self, user_message):
+        """Estimated prompt size for the next request"""
+        with self._lock:
+            return self._window_tokens() + estimate_tokens(user_message)
+
+    def clear(self):
+        with self._lock:
+            self.summary = ""
+            self.recent = []
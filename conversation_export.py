@@ -0,0 +1,69 @@
+"""Streaming conversation exports.
+
+Every format is produced incrementally from the message list straight into a
+binary file object, so export time is linear in conversation length and memory
+stays bounded no matter how long the chat is.
+"""
+import json
+import zipfile
+
+EXPORT_FORMATS = {
+    "Text": {"extension": "txt", "mime": "text/plain"},
+    "JSONL": {"extension": "jsonl", "mime": "application/x-ndjson"},
+    "Bundle (text + audio)": {"extension": "zip", "mime": "application/zip"},
+}
+
+
+def iter_text(messages):
+    """Plain-text transcript, one chunk per message"""
+    yield "Voice Chat Conversation\n"
+    yield "=" * 50 + "\n\n"
+    for msg in messages:
+        role = "You" if msg["role"] == "user" else "Assistant"
+        yield f"{role}:\n{msg['content']}\n\n"
+
+
+def iter_jsonl(messages, audio_names=None):
+    """One JSON object per message, with timings and the bundled audio file name"""
+    for index, msg in enumerate(messages):
+        record = {"index": index, "role": msg["role"], "content": msg["content"]}
+        if msg.get("timings"):
+            record["timings"] = msg["timings"]
+        if audio_names and index in audio_names:
+            record["audio"] = audio_names[index]
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def write_chunks(chunks, out):
+    """Encode text chunks into a binary file object as they are produced"""
+    for chunk in chunks:
+        out.write(chunk.encode("utf-8"))
+
+
+def write_bundle(messages, out, load_audio):
+    """Zip with the text transcript, a JSONL log and the synthesized audio of each turn"""
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+        audio_names = {}
+        for index, msg in enumerate(messages):
+            audio_id = msg.get("audio_id")
+            audio = load_audio(audio_id) if audio_id else None
+            if not audio:
+                continue
+            name = f"audio/turn-{index:04d}.mp3"
+            # MP3 is already compressed; store it as-is
+            bundle.writestr(name, audio, compress_type=zipfile.ZIP_STORED)
+            audio_names[index] = name
+        with bundle.open("conversation.txt", "w") as f:
+            write_chunks(iter_text(messages), f)
+        with bundle.open("conversation.jsonl", "w") as f:
+            write_chunks(iter_jsonl(messages, audio_names), f)
+
+
+def export_conversation(messages, fmt, out, load_audio=None):
+    """Write ``messages`` to the binary file object ``out`` in one of EXPORT_FORMATS"""
+    if fmt == "Text":
+        write_chunks(iter_text(messages), out)
+    elif fmt == "JSONL":
+        write_chunks(iter_jsonl(messages), out)
+    else:
+        write_bundle(messages, out, load_audio or (lambda audio_id: None))
@@ -0,0 +1,221 @@
+"""Durable conversation storage.
+
+Messages are persisted per session in a pluggable backend (SQLite or an
+append-only JSONL log). A session only keeps a small hot window of recent
+messages in memory and loads older ones lazily; audio is referenced by id,
+never stored inline.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+
+# Message fields stored verbatim; everything else goes into the JSON "meta" column
+_CORE_FIELDS = ("role", "content")
+
+# Session ids are uuid4 hex strings; anything else never reaches a file name or query
+_SESSION_ID = re.compile(r"[0-9a-f]{32}")
+
+
+def is_valid_session_id(session_id):
+    return isinstance(session_id, str) and _SESSION_ID.fullmatch(session_id) is not None
+
+
+def _checked(session_id):
+    if not is_valid_session_id(session_id):
+        raise ValueError(f"invalid session id: {session_id!r}")
+    return session_id
+
+
+def _split(message):
+    meta = {key: value for key, value in message.items() if key not in _CORE_FIELDS}
+    return message["role"], message["content"], meta
+
+
+def _join(role, content, meta):
+    message = {"role": role, "content": content}
+    message.update(meta)
+    return message
+
+
+class ConversationStore:
+    """Backend interface: an ordered list of messages per session id"""
+
+    def append(self, session_id, message):
+        raise NotImplementedError
+
+    def count(self, session_id):
+        raise NotImplementedError
+
+    def load(self, session_id, start, stop):
+        """Messages ``start`` (inclusive) to ``stop`` (exclusive), oldest first"""
+        raise NotImplementedError
+
+    def clear(self, session_id):
+        raise NotImplementedError
+
+
+class SQLiteConversationStore(ConversationStore):
+    """All sessions in one SQLite database; safe to share between threads"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                " session_id TEXT NOT NULL,"
+                " idx INTEGER NOT NULL,"
+                " role TEXT NOT NULL,"
+                " content TEXT NOT NULL,"
+                " meta TEXT NOT NULL DEFAULT '{}',"
+                " PRIMARY KEY (session_id, idx))"
+            )
+
+    def append(self, session_id, message):
+        role, content, meta = _split(message)
+        with self._lock, self._db:
+            (index,) = self._db.execute(
+                "SELECT COUNT(*) FROM messages WHERE session_id = ?", (_checked(session_id),)
+            ).fetchone()
+            self._db.execute(
+                "INSERT INTO messages (session_id, idx, role, content, meta) VALUES (?, ?, ?, ?, ?)",
+                (_checked(session_id), index, role, content, json.dumps(meta, ensure_ascii=False)),
+            )
+        return index
+
+    def count(self, session_id):
+        with self._lock:
+            (count,) = self._db.execute(
+                "SELECT COUNT(*) FROM messages WHERE session_id = ?", (_checked(session_id),)
+            ).fetchone()
+        return count
+
+    def load(self, session_id, start, stop):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT role, content, meta FROM messages"
+                " WHERE session_id = ? AND idx >= ? AND idx < ? ORDER BY idx",
+                (_checked(session_id), start, stop),
+            ).fetchall()
+        return [_join(role, content, json.loads(meta)) for role, content, meta in rows]
+
+    def clear(self, session_id):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM messages WHERE session_id = ?", (_checked(session_id),))
+
+
+class JsonlConversationStore(ConversationStore):
+    """One append-only JSONL log per session, with byte offsets indexed lazily"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._offsets = {}
+
+    def _path(self, session_id):
+        return os.path.join(self.directory, f"{_checked(session_id)}.jsonl")
+
+    def _index(self, session_id):
+        offsets = self._offsets.get(session_id)
+        if offsets is None:
+            offsets = []
+            try:
+                with open(self._path(session_id), "rb") as log:
+                    position = 0
+                    for line in log:
+                        offsets.append(position)
+                        position += len(line)
+            except FileNotFoundError:
+                pass
+            self._offsets[session_id] = offsets
+        return offsets
+
+    def append(self, session_id, message):
+        line = (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            offsets = self._index(session_id)
+            with open(self._path(session_id), "ab") as log:
+                position = log.tell()
+                log.write(line)
+            offsets.append(position)
+            return len(offsets) - 1
+
+    def count(self, session_id):
+        with self._lock:
+            return len(self._index(session_id))
+
+    def load(self, session_id, start, stop):
+        with self._lock:
+            offsets = self._index(session_id)[start:stop]
+        if not offsets:
+            return []
+        messages = []
+        with open(self._path(session_id), "rb") as log:
+            log.seek(offsets[0])
+            for _ in offsets:
+                messages.append(json.loads(log.readline()))
+        return messages
+
+    def clear(self, session_id):
+        with self._lock:
+            self._offsets.pop(session_id, None)
+            try:
+                os.unlink(self._path(session_id))
+            except FileNotFoundError:
+                pass
+
+
+def open_store(backend, location):
+    """Create a store for ``backend`` ("sqlite" or "jsonl") at ``location``"""
+    if backend == "jsonl":
+        return JsonlConversationStore(location)
+    return SQLiteConversationStore(location)
+
+
+class Conversation:
+    """One session's conversation: recent messages in memory, the rest in the store"""
+
+    def __init__(self, store, session_id, hot_window=50, batch_size=200):
+        self.store = store
+        self.session_id = session_id
+        self.hot_window = hot_window
+        self.batch_size = batch_size
+        self._count = store.count(session_id)
+        self._hot = store.load(session_id, max(0, self._count - hot_window), self._count)
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return self._count > 0
+
+    def append(self, message):
+        self.store.append(self.session_id, message)
+        self._count += 1
+        self._hot.append(message)
+        if len(self._hot) > self.hot_window:
+            del self._hot[: len(self._hot) - self.hot_window]
+
+    def recent(self, limit):
+        """The last ``limit`` messages; reads the store only beyond the hot window"""
+        limit = min(limit, self._count)
+        if limit <= len(self._hot):
+            return self._hot[len(self._hot) - limit:]
+        older = self.store.load(self.session_id, self._count - limit, self._count - len(self._hot))
+        return older + self._hot
+
+    def __iter__(self):
+        """Stream the whole conversation from the store in batches"""
+        for start in range(0, self._count, self.batch_size):
+            yield from self.store.load(self.session_id, start, min(start + self.batch_size, self._count))
+
+    def clear(self):
+        self.store.clear(self.session_id)
+        self._count = 0
+        self._hot = []
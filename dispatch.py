@@ -0,0 +1,130 @@
+"""Process-wide dispatch layer in front of the Gemini and Murf APIs.
+
+Every provider call goes through a ``ProviderGate``, which:
+
+* coalesces identical in-flight requests (single-flight), so concurrent
+  sessions asking for the same audio or transcript share one API call;
+* paces requests with a token bucket at the provider's quota, queueing callers
+  instead of letting bursts turn into 429s;
+* bounds concurrent requests per provider, so waiting callers apply
+  backpressure rather than piling up open connections;
+* backs off and retries when the provider still answers 429, pausing the whole
+  bucket so other callers slow down too.
+"""
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from rate_limit import RateLimiter
+
+
+class QueueTimeout(Exception):
+    """A request waited longer than the gate's queue timeout for its turn"""
+
+
+def is_rate_limited(error):
+    """True for provider errors that mean "too many requests" (HTTP 429)"""
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    try:
+        return int(status) == 429
+    except (TypeError, ValueError):
+        return type(error).__name__ == "ResourceExhausted"
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers with the same key share its outcome"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, *args):
+        """Returns ``(result, shared)``; ``shared`` is True if another caller did the work"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = func(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class ProviderGate:
+    """Single-flight, rate-limited, concurrency-bounded access to one provider"""
+
+    def __init__(self, name, rate, burst=None, max_concurrent=8, max_retries=3,
+                 backoff_s=1.0, queue_timeout=None):
+        self.name = name
+        self.limiter = RateLimiter(rate, burst)
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._flights = SingleFlight()
+        self._lock = threading.Lock()
+        self._stats = {
+            "calls": 0, "coalesced": 0, "throttled": 0, "errors": 0,
+            "queued_s": 0.0, "waiting": 0, "in_flight": 0,
+        }
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, value in deltas.items():
+                self._stats[name] += value
+
+    def call(self, func, *args, key=None):
+        """Call ``func(*args)`` through the gate; callers passing the same ``key`` share one call"""
+        if key is None:
+            return self._dispatch(func, args)
+        result, shared = self._flights.do(key, self._dispatch, func, args)
+        if shared:
+            self._count(coalesced=1)
+        return result
+
+    def _dispatch(self, func, args):
+        queued = time.monotonic()
+        deadline = None if self.queue_timeout is None else queued + self.queue_timeout
+        self._count(waiting=1)
+        try:
+            if not self._slots.acquire(timeout=self.queue_timeout):
+                raise QueueTimeout(f"{self.name}: no free request slot after {self.queue_timeout}s")
+        finally:
+            self._count(waiting=-1)
+        try:
+            for attempt in range(self.max_retries + 1):
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                if not self.limiter.acquire(timeout=remaining):
+                    raise QueueTimeout(f"{self.name}: rate limit queue exceeded {self.queue_timeout}s")
+                self._count(calls=1, queued_s=time.monotonic() - queued, in_flight=1)
+                try:
+                    return func(*args)
+                except Exception as e:
+                    if attempt == self.max_retries or not is_rate_limited(e):
+                        self._count(errors=1)
+                        raise
+                    delay = self.backoff_s * (2 ** attempt) * random.uniform(0.5, 1.5)
+                    self._count(throttled=1)
+                    # Slow every caller of this provider down, not just this one
+                    self.limiter.pause(delay)
+                    queued = time.monotonic()
+                finally:
+                    self._count(in_flight=-1)
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
@@ -1,6 +1,51 @@
-def main():
-    print("Hello from repl-nix-workspace!")
+"""Command-line entry point for running the voice pipeline without the UI.
+
+    python main.py batch prompts/ --output-dir out/ --workers 4
+    python main.py batch manifest.jsonl --output-dir out/ --gemini-rps 1 --murf-rps 3
+
+The Streamlit app itself is started with ``streamlit run app.py``.
+"""
+import argparse
+import json
+import sys
+
+
+def batch(args):
+    from batch import BatchRunner, load_items
+
+    items = load_items(args.source)
+    runner = BatchRunner(
+        args.output_dir,
+        workers=args.workers,
+        gemini_rps=args.gemini_rps,
+        murf_rps=args.murf_rps,
+        voice_id=args.voice,
+    )
+    if not runner.app.get_gemini_client():
+        sys.exit("GOOGLE_API_KEY not found in environment variables")
+    report = runner.run(items)
+    print(json.dumps({key: value for key, value in report.items() if key != "results"}, indent=2))
+    return 1 if report["statuses"].get("error") else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Voice chat pipeline tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch_parser = commands.add_parser(
+        "batch", help="transcribe, answer and synthesize a directory or manifest of audio files / text prompts"
+    )
+    batch_parser.add_argument("source", help="directory of audio and .txt files, or a .jsonl/.csv manifest")
+    batch_parser.add_argument("--output-dir", default="batch-output")
+    batch_parser.add_argument("--workers", type=int, default=4, help="items processed concurrently")
+    batch_parser.add_argument("--gemini-rps", type=float, default=2.0, help="Gemini requests per second")
+    batch_parser.add_argument("--murf-rps", type=float, default=2.0, help="Murf requests per second")
+    batch_parser.add_argument("--voice", default="en-US-ken", help="Murf voice id")
+    batch_parser.set_defaults(func=batch)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
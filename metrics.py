@@ -0,0 +1,137 @@
+"""Per-stage latency, byte and error metrics.
+
+Each pipeline stage (audio export, STT, LLM, TTS generate/download, MP3 decode,
+waveform render) records its duration into a rolling histogram. The registry is
+process-wide and thread-safe, and can be read as a snapshot for the UI, as
+Prometheus text exposition, or as a one-line JSON log record.
+"""
+import bisect
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the cumulative Prometheus buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def quantile(ordered, q):
+    """Linearly interpolated quantile (0 <= q <= 1) of an already sorted list"""
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class Histogram:
+    """Latency distribution: exact quantiles over a rolling window, buckets over all time"""
+
+    def __init__(self, window=512, buckets=BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.recent = deque(maxlen=window)
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+        self.bytes = 0
+
+    def observe(self, seconds, nbytes=0):
+        self.recent.append(seconds)
+        self.bucket_counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.bytes += nbytes
+
+    def summary(self):
+        ordered = sorted(self.recent)
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "p50_s": quantile(ordered, 0.50),
+            "p95_s": quantile(ordered, 0.95),
+            "p99_s": quantile(ordered, 0.99),
+            "mean_s": self.sum / self.count if self.count else None,
+        }
+
+
+class Metrics:
+    """Thread-safe registry of one Histogram per stage name"""
+
+    def __init__(self, window=512, prefix="voice_chat"):
+        self.window = window
+        self.prefix = prefix
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def _stage(self, stage):
+        histogram = self._stages.get(stage)
+        if histogram is None:
+            histogram = self._stages[stage] = Histogram(self.window)
+        return histogram
+
+    def observe(self, stage, seconds, nbytes=0):
+        with self._lock:
+            self._stage(stage).observe(seconds, nbytes)
+
+    def error(self, stage):
+        with self._lock:
+            self._stage(stage).errors += 1
+
+    @contextmanager
+    def span(self, stage):
+        """Time the block as ``stage``; set ``span["bytes"]`` inside to count payload size.
+
+        A block that raises is counted as an error, not as a latency sample;
+        control-flow exits (e.g. Streamlit's rerun) are recorded as neither.
+        """
+        record = {"bytes": 0}
+        started = time.perf_counter()
+        try:
+            yield record
+        except Exception:
+            self.error(stage)
+            raise
+        self.observe(stage, time.perf_counter() - started, record["bytes"])
+
+    def snapshot(self):
+        """{stage: {count, errors, bytes, p50_s, p95_s, p99_s, mean_s}}"""
+        with self._lock:
+            return {stage: histogram.summary() for stage, histogram in self._stages.items()}
+
+    def prometheus(self):
+        """Prometheus text exposition of every stage"""
+        name = f"{self.prefix}_stage_seconds"
+        lines = [
+            f"# HELP {name} Duration of voice chat pipeline stages.",
+            f"# TYPE {name} histogram",
+        ]
+        totals = []
+        with self._lock:
+            for stage, histogram in sorted(self._stages.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.buckets + (float("inf"),), histogram.bucket_counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+                totals.append((stage, histogram.errors, histogram.bytes))
+        lines.append(f"# TYPE {self.prefix}_stage_errors_total counter")
+        lines += [f'{self.prefix}_stage_errors_total{{stage="{stage}"}} {errors}' for stage, errors, _ in totals]
+        lines.append(f"# TYPE {self.prefix}_stage_bytes_total counter")
+        lines += [f'{self.prefix}_stage_bytes_total{{stage="{stage}"}} {nbytes}' for stage, _, nbytes in totals]
+        return "\n".join(lines) + "\n"
+
+    def log_line(self, **fields):
+        """One JSON object with ``fields`` plus the current per-stage summary"""
+        record = {"ts": round(time.time(), 3)}
+        record.update(fields)
+        record["stages"] = {
+            stage: {key: round(value, 4) if isinstance(value, float) else value for key, value in summary.items()}
+            for stage, summary in self.snapshot().items()
+        }
+        return json.dumps(record, separators=(",", ":"))
@@ -0,0 +1,177 @@
+"""Reusable Murf TTS client.
+
+One ``requests.Session`` keeps TLS connections alive between calls, retries
+429/5xx responses with exponential backoff and, in inline mode, asks Murf to
+return the audio base64-encoded in the generate response so no second download
+round-trip is needed.
+"""
+import base64
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+MURF_API_URL = "https://api.murf.ai/v1"
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# For callers that handle 429 themselves (e.g. a dispatch.ProviderGate, which backs
+# every caller off at once): retrying it here too would only multiply the attempts
+SERVER_ERROR_STATUSES = (500, 502, 503, 504)
+
+# Named output formats for a single synthetic voice. All stay MP3 because the
+# players, the reply audio store and the waveform decoder expect it.
+TTS_PROFILES = {
+    "Low latency (mono 24 kHz)": {"sampleRate": 24000, "channelType": "MONO", "format": "MP3"},
+    "Bandwidth saver (mono 8 kHz)": {"sampleRate": 8000, "channelType": "MONO", "format": "MP3"},
+    "Hi-fi (stereo 48 kHz)": {"sampleRate": 48000, "channelType": "STEREO", "format": "MP3"},
+}
+
+
+def speech_payload(text, voice_id="en-US-ken", **overrides):
+    """Default /speech/generate payload used by the app, with optional overrides"""
+    payload = {
+        "voiceId": voice_id,
+        "style": "Conversational",
+        "text": text,
+        "rate": 0,
+        "pitch": 0,
+        "sampleRate": 48000,
+        "format": "MP3",
+        "channelType": "STEREO",
+        "pronunciationDictionary": {},
+        "encodeAsBase64": False,
+        "variation": 1,
+        "audioDuration": 0,
+        "modelVersion": "GEN2"
+    }
+    payload.update(overrides)
+    return payload
+
+
+class MurfError(Exception):
+    """Murf request failed; the message is safe to show to the user"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class MurfClient:
+    """Pooled, retrying Murf API client that is safe to share between threads"""
+
+    def __init__(self, api_key=None, base_url=MURF_API_URL, inline_audio=True,
+                 pool_size=10, max_retries=3, backoff_factor=0.5, timeout=30, metrics=None,
+                 retry_statuses=RETRY_STATUSES):
+        self.api_key = api_key
+        # Optional metrics.Metrics; records tts_generate and tts_download stages
+        self.metrics = metrics
+        self.base_url = base_url.rstrip("/")
+        self.inline_audio = inline_audio
+        self.timeout = timeout
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=retry_statuses,
+            # Speech generation is safe to repeat, so POSTs are retried too
+            allowed_methods=frozenset({"GET", "POST"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        self._adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "round_trips": 0, "errors": 0, "bytes": 0, "seconds": 0.0}
+
+    def _record(self, **deltas):
+        with self._lock:
+            for name, value in deltas.items():
+                self._stats[name] += value
+
+    def _span(self, stage):
+        return self.metrics.span(stage) if self.metrics else nullcontext({})
+
+    def _headers(self):
+        api_key = self.api_key or os.getenv("MURF_API_KEY")
+        if not api_key:
+            raise MurfError("MURF_API_KEY not found in environment variables")
+        return {"Content-Type": "application/json", "api-key": api_key}
+
+    def warm_up(self):
+        """Open a pooled connection ahead of the first real request"""
+        try:
+            self.session.head(self.base_url, timeout=self.timeout)
+        except requests.RequestException:
+            pass
+
+    def generate(self, payload, info=None):
+        """POST a /speech/generate payload and return the audio bytes.
+
+        If ``info`` is given it is filled with ``request_s``, ``download_s``,
+        ``bytes`` and, when Murf reports it, ``audio_s`` (speech duration).
+        """
+        headers = self._headers()
+        payload = dict(payload, encodeAsBase64=self.inline_audio)
+        started = time.perf_counter()
+        round_trips = 1
+        try:
+            with self._span("tts_generate") as span:
+                request_started = time.perf_counter()
+                response = self.session.post(
+                    f"{self.base_url}/speech/generate", json=payload, headers=headers, timeout=self.timeout
+                )
+                if response.status_code != 200:
+                    raise MurfError(f"API Error: {response.status_code} - {response.text}", response.status_code)
+                span["bytes"] = len(response.content)
+            request_s = time.perf_counter() - request_started
+            download_started = time.perf_counter()
+
+            result = response.json()
+            if result.get("encodedAudio"):
+                audio = base64.b64decode(result["encodedAudio"])
+            elif result.get("audioFile"):
+                round_trips += 1
+                with self._span("tts_download") as span:
+                    audio_response = self.session.get(result["audioFile"], timeout=self.timeout)
+                    if audio_response.status_code != 200:
+                        raise MurfError(
+                            f"Audio download failed: {audio_response.status_code}", audio_response.status_code
+                        )
+                    audio = audio_response.content
+                    span["bytes"] = len(audio)
+            else:
+                raise MurfError("Murf response contained no audio")
+        except (MurfError, requests.RequestException):
+            self._record(calls=1, errors=1, round_trips=round_trips, seconds=time.perf_counter() - started)
+            raise
+        self._record(calls=1, round_trips=round_trips, bytes=len(audio), seconds=time.perf_counter() - started)
+        if info is not None:
+            info["request_s"] = request_s
+            # Inline audio arrives with the response; only a separate fetch counts as download
+            info["download_s"] = time.perf_counter() - download_started if round_trips > 1 else 0.0
+            info["bytes"] = len(audio)
+            if result.get("audioLengthInSeconds"):
+                info["audio_s"] = float(result["audioLengthInSeconds"])
+        return audio
+
+    def connections_opened(self):
+        """Number of TCP/TLS connections the pool has had to open so far"""
+        pools = self._adapter.poolmanager.pools
+        return sum(pools[key].num_connections for key in list(pools.keys()) if key in pools)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["connections_opened"] = self.connections_opened()
+        stats["avg_seconds"] = stats["seconds"] / stats["calls"] if stats["calls"] else 0.0
+        return stats
+
+    def close(self):
+        self.session.close()
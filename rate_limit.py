@@ -0,0 +1,50 @@
+"""Token-bucket rate limiting shared between threads.
+
+Callers block in ``acquire`` until a token is available instead of failing, so
+a burst of work is smoothed out to the configured rate rather than turned into
+provider 429s.
+"""
+import threading
+import time
+
+
+class RateLimiter:
+    """Token bucket: ``rate`` requests per second on average, bursts of up to ``burst``"""
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_s = 0.0
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1, timeout=None):
+        """Block until ``tokens`` are available; returns False if ``timeout`` expires first"""
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self.waited_s += now - started
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if deadline is not None:
+                if now + wait > deadline:
+                    return False
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold off every caller for about ``seconds`` (e.g. after the provider answered 429)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self.rate)
@@ -0,0 +1,168 @@
+"""Sentence-level TTS pipelining.
+
+Replies are split into sentence/clause chunks that are synthesized concurrently
+with bounded parallelism and handed back strictly in reply order, so playback of
+the first chunk can start while the rest are still being generated. Streamed
+LLM output goes through ``SentenceBuffer`` so chunks are released as soon as
+their sentence is complete.
+"""
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Sentence ends: terminal punctuation (optionally followed by closing quotes or
+# brackets) and then whitespace, except after common abbreviations ("Dr. Smith")
+_SENTENCE_END = re.compile(
+    r"(?:(?<=[.!?…])|(?<=[.!?…][\"')\]]))"
+    r"(?<!\bDr\.)(?<!\bMr\.)(?<!\bMs\.)(?<!\bMrs\.)(?<!\bSt\.)(?<!\bvs\.)(?<!\be\.g\.)(?<!\bi\.e\.)"
+    r"\s+"
+)
+# Clause boundaries used to break up sentences that are too long to start quickly
+_CLAUSE_END = re.compile(r"(?<=[,;:—])\s+")
+
+
+def _split_long(sentence, max_chars):
+    """Break an over-long sentence at clause boundaries, then at word boundaries"""
+    if len(sentence) <= max_chars:
+        return [sentence]
+    pieces = []
+    current = ""
+    for clause in _CLAUSE_END.split(sentence):
+        if current and len(current) + 1 + len(clause) > max_chars:
+            pieces.append(current)
+            current = clause
+        else:
+            current = f"{current} {clause}".strip()
+    if current:
+        pieces.append(current)
+
+    result = []
+    for piece in pieces:
+        while len(piece) > max_chars:
+            cut = piece.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            result.append(piece[:cut].strip())
+            piece = piece[cut:].strip()
+        if piece:
+            result.append(piece)
+    return result
+
+
+def split_sentences(text, max_chars=240, min_chars=20):
+    """Split text into speakable chunks in reading order.
+
+    Sentences longer than ``max_chars`` are split at clauses; fragments shorter
+    than ``min_chars`` are merged into the following chunk so Murf is not called
+    for a lone "Sure." unless it is the whole reply.
+    """
+    text = " ".join(text.split())
+    if not text:
+        return []
+
+    chunks = []
+    pending = ""
+    for sentence in _SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        for piece in _split_long(sentence, max_chars):
+            candidate = f"{pending} {piece}".strip()
+            if len(candidate) < min_chars:
+                pending = candidate
+                continue
+            chunks.append(candidate)
+            pending = ""
+    if pending:
+        if chunks and len(chunks[-1]) + 1 + len(pending) <= max_chars:
+            chunks[-1] = f"{chunks[-1]} {pending}"
+        else:
+            chunks.append(pending)
+    return chunks
+
+
+class SentenceBuffer:
+    """Accumulates streamed text and releases chunks once their sentence is complete"""
+
+    def __init__(self, max_chars=240, min_chars=20):
+        self.max_chars = max_chars
+        self.min_chars = min_chars
+        self._pending = ""
+
+    def feed(self, text):
+        """Add streamed text; return the chunks that are now complete"""
+        self._pending += text
+        last_end = None
+        for last_end in _SENTENCE_END.finditer(self._pending):
+            pass
+        if last_end is not None:
+            complete = self._pending[:last_end.start()]
+            self._pending = self._pending[last_end.end():]
+            chunks = split_sentences(complete, self.max_chars, self.min_chars)
+            if chunks and len(chunks[-1]) < self.min_chars:
+                # Too short to be worth a request on its own ("Sure."): wait for more text
+                self._pending = f"{chunks.pop()} {self._pending}"
+            return chunks
+        if len(self._pending) > self.max_chars:
+            # No sentence end in sight: release whole clauses, keep the tail
+            pieces = _split_long(" ".join(self._pending.split()), self.max_chars)
+            self._pending = pieces.pop()
+            return pieces
+        return []
+
+    def flush(self):
+        """Return whatever is left once the stream has ended"""
+        remaining, self._pending = self._pending, ""
+        return split_sentences(remaining, self.max_chars, self.min_chars)
+
+
+class OrderedSynthesizer:
+    """Synthesizes submitted chunks on a bounded thread pool and releases them in order.
+
+    Results are ``(index, text, audio_bytes, seconds_since_start)`` tuples;
+    ``audio_bytes`` is None when synthesis of that chunk failed.
+    """
+
+    def __init__(self, synthesize, max_workers=3, initializer=None):
+        self._synthesize = synthesize
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, initializer=initializer)
+        self._pending = deque()
+        self._submitted = 0
+        self._started = time.perf_counter()
+
+    @property
+    def submitted(self):
+        return self._submitted
+
+    def submit(self, text):
+        future = self._executor.submit(self._synthesize, text)
+        self._pending.append((self._submitted, text, future))
+        self._submitted += 1
+
+    def _pop(self):
+        index, text, future = self._pending.popleft()
+        try:
+            audio = future.result()
+        except Exception:
+            audio = None
+        return index, text, audio, time.perf_counter() - self._started
+
+    def ready(self):
+        """Yield the finished results at the head of the queue without blocking"""
+        while self._pending and self._pending[0][2].done():
+            yield self._pop()
+
+    def drain(self):
+        """Yield every remaining result in order, waiting as needed"""
+        while self._pending:
+            yield self._pop()
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,121 @@
+"""Energy-based voice activity detection for trimming recordings before STT.
+
+Recordings are split into short frames and each frame's RMS level is computed
+in one vectorized pass. Frames above a threshold count as speech; a hangover
+after each voiced frame (and a short pre-roll before it) keeps word onsets and
+trailing consonants. Everything before the first and after the last speech
+frame is cut, and long pauses in between can optionally be shortened.
+"""
+import numpy as np
+
+from waveform import segment_samples
+
+DEFAULT_FRAME_MS = 20
+DEFAULT_THRESHOLD_DB = -45.0
+DEFAULT_MARGIN_DB = 12.0
+DEFAULT_HANGOVER_MS = 300
+DEFAULT_PREROLL_MS = 150
+
+
+def frame_levels_db(segment, frame_ms=DEFAULT_FRAME_MS):
+    """RMS level of each full frame in dBFS, with all channels folded together.
+
+    Returns ``(levels, frame_len)`` where ``frame_len`` is in sample frames.
+    """
+    frame_len = max(1, int(segment.frame_rate * frame_ms / 1000))
+    samples = segment_samples(segment)
+    channels = segment.channels
+    samples = samples[: len(samples) - len(samples) % channels].reshape(-1, channels)
+    count = len(samples) // frame_len
+    if count == 0:
+        return np.zeros(0, dtype=np.float32), frame_len
+
+    # segment_samples decodes every width (8-bit included) as signed, centred on 0
+    frames = samples[: count * frame_len].astype(np.float32).reshape(count, frame_len * channels)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    full_scale = float(2 ** (8 * segment.sample_width - 1))
+    return 20 * np.log10(np.maximum(rms / full_scale, 1e-10)), frame_len
+
+
+def speech_threshold_db(levels, threshold_db=DEFAULT_THRESHOLD_DB, margin_db=DEFAULT_MARGIN_DB):
+    """Threshold that adapts to the background noise floor but never exceeds the speech level.
+
+    The floor is the 10th percentile frame level; the threshold sits ``margin_db``
+    above it, clamped to at most ``margin_db`` below the loudest frame and to at
+    least the absolute ``threshold_db``.
+    """
+    if len(levels) == 0:
+        return threshold_db
+    floor_db = float(np.percentile(levels, 10))
+    peak_db = float(levels.max())
+    return max(threshold_db, min(floor_db + margin_db, peak_db - margin_db))
+
+
+def dilate(mask, before, after):
+    """Extend every True frame ``before`` frames earlier and ``after`` frames later"""
+    if not mask.any() or (before == 0 and after == 0):
+        return mask.copy()
+    counts = np.convolve(mask.astype(np.int32), np.ones(before + after + 1, dtype=np.int32))
+    return counts[before: before + len(mask)] > 0
+
+
+def _runs(mask, value):
+    """(start, stop) frame ranges where ``mask`` equals ``value``"""
+    padded = np.concatenate(([False], mask == value, [False]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    return list(zip(edges[::2], edges[1::2]))
+
+
+def trim_silence(segment, frame_ms=DEFAULT_FRAME_MS, threshold_db=DEFAULT_THRESHOLD_DB,
+                 margin_db=DEFAULT_MARGIN_DB, hangover_ms=DEFAULT_HANGOVER_MS,
+                 preroll_ms=DEFAULT_PREROLL_MS, max_pause_ms=None):
+    """Cut leading/trailing silence (and optionally long pauses) from a pydub segment.
+
+    Returns ``(segment, stats)``; stats holds ``original_s``, ``trimmed_s``,
+    ``trimmed_ratio`` (fraction of the duration removed), ``speech_detected``
+    and ``pauses_shortened``. A recording without any speech is returned as-is
+    with ``speech_detected`` False.
+    """
+    original_s = segment.duration_seconds
+    stats = {
+        "original_s": original_s,
+        "trimmed_s": original_s,
+        "trimmed_ratio": 0.0,
+        "speech_detected": True,
+        "pauses_shortened": 0,
+    }
+    levels, frame_len = frame_levels_db(segment, frame_ms)
+    if len(levels) == 0:
+        return segment, stats
+
+    voiced = levels > speech_threshold_db(levels, threshold_db, margin_db)
+    if not voiced.any():
+        stats["speech_detected"] = False
+        return segment, stats
+
+    speech = dilate(voiced, before=int(preroll_ms // frame_ms), after=int(hangover_ms // frame_ms))
+    first = int(np.argmax(speech))
+    last = len(speech) - int(np.argmax(speech[::-1]))
+    keep = np.zeros_like(speech)
+    keep[first:last] = True
+    if max_pause_ms:
+        # Shorten every pause between speech to max_pause_ms, keeping its edges
+        max_pause = max(1, int(max_pause_ms // frame_ms))
+        for start, stop in _runs(speech[first:last], False):
+            if stop - start > max_pause:
+                keep[first + start + max_pause // 2: first + stop - (max_pause - max_pause // 2)] = False
+                stats["pauses_shortened"] += 1
+
+    bytes_per_frame = frame_len * segment.frame_width
+    raw = segment.raw_data
+    pieces = []
+    for start, stop in _runs(keep, True):
+        # The partial frame after the last full one follows the last frame's decision
+        end = len(raw) if stop == len(keep) else stop * bytes_per_frame
+        pieces.append(raw[start * bytes_per_frame: end])
+    # _spawn keeps the segment's format; it is how pydub itself builds derived segments
+    trimmed = segment._spawn(b"".join(pieces))
+
+    stats["trimmed_s"] = trimmed.duration_seconds
+    stats["trimmed_ratio"] = 1 - trimmed.duration_seconds / original_s if original_s else 0.0
+    return trimmed, stats
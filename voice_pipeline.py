@@ -0,0 +1,103 @@
+"""Asyncio engine for one record → transcribe → respond → speak turn.
+
+Blocking stages run on a shared thread pool so independent work (waveform
+rendering, opening the Murf connection, ...) overlaps the critical path. Every
+stage is timed, and a turn can be cancelled from another thread when the user
+starts a new one.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared by all turns; a private pool (rather than asyncio's default executor)
+# means finishing a turn never waits for abandoned background work.
+_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="voice-turn")
+
+
+class TurnCancelled(Exception):
+    """The turn was superseded by a newer one"""
+
+
+class TurnPipeline:
+    """Runs the stages of one turn and records how long each took"""
+
+    def __init__(self, thread_initializer=None):
+        self.timings = {}
+        self._thread_initializer = thread_initializer
+        self._cancelled = threading.Event()
+        self._loop = None
+        self._futures = set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """Stop the turn: pending stages are cancelled and no new stage starts"""
+        self._cancelled.set()
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            for future in list(self._futures):
+                loop.call_soon_threadsafe(future.cancel)
+
+    def _check(self):
+        if self.cancelled:
+            raise TurnCancelled()
+
+    def _call(self, func, args):
+        if self._thread_initializer is not None:
+            self._thread_initializer()
+        return func(*args)
+
+    def _submit(self, name, func, args):
+        self._check()
+        started = time.perf_counter()
+        future = self._loop.run_in_executor(_EXECUTOR, self._call, func, args)
+        self._futures.add(future)
+
+        def finished(done):
+            self._futures.discard(done)
+            if not done.cancelled():
+                self.timings[name] = time.perf_counter() - started
+
+        future.add_done_callback(finished)
+        return future
+
+    async def run(self, name, func, *args):
+        """Critical-path stage: run a blocking function on the pool and wait for it"""
+        result = await self._submit(name, func, args)
+        self._check()
+        return result
+
+    def background(self, name, func, *args):
+        """Start independent work now; await the returned future only if its result is needed"""
+        return self._submit(name, func, args)
+
+    def run_inline(self, name, func, *args):
+        """Critical-path stage that must run on the calling thread (e.g. because it renders UI)"""
+        self._check()
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self.timings[name] = time.perf_counter() - started
+
+    def execute(self, turn, *args):
+        """Run ``turn(pipeline, *args)`` to completion; returns None if cancelled"""
+        async def main():
+            self._loop = asyncio.get_running_loop()
+            try:
+                return await turn(self, *args)
+            finally:
+                # Background work nobody awaited is abandoned, not waited for
+                for future in list(self._futures):
+                    future.cancel()
+
+        started = time.perf_counter()
+        try:
+            return asyncio.run(main())
+        except (TurnCancelled, asyncio.CancelledError):
+            return None
+        finally:
+            self.timings["turn"] = time.perf_counter() - started
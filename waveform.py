@@ -0,0 +1,115 @@
+"""Waveform rendering for recorded and synthesized audio.
+
+Clips are reduced to a fixed number of pixel columns with a vectorized min/max
+peak envelope before anything is drawn, so rendering cost does not grow with
+clip length or sample rate.
+"""
+import hashlib
+from io import BytesIO
+
+import numpy as np
+
+DEFAULT_COLUMNS = 800
+
+# pydub re-biases 8-bit WAV data to signed on load, so every width is signed here
+_SAMPLE_DTYPES = {1: np.int8, 2: np.int16, 4: np.int32}
+
+
+def audio_hash(segment):
+    """Content hash of a pydub segment's PCM data and format"""
+    digest = hashlib.sha1(segment.raw_data)
+    digest.update(f"{segment.frame_rate}:{segment.channels}:{segment.sample_width}".encode())
+    return digest.hexdigest()
+
+
+def segment_samples(segment):
+    """Interleaved samples of a pydub segment as a NumPy view (no copy where possible)"""
+    dtype = _SAMPLE_DTYPES.get(segment.sample_width)
+    if dtype is None:
+        # 24-bit audio has no NumPy dtype; let pydub unpack it
+        return np.asarray(segment.get_array_of_samples())
+    return np.frombuffer(segment.raw_data, dtype=dtype)
+
+
+def normalize_peaks(peaks, sample_width):
+    """Scale integer peaks to floats in [-1, 1]"""
+    return peaks.astype(np.float32) / float(2 ** (8 * sample_width - 1))
+
+
+def peak_envelope(samples, channels=1, columns=DEFAULT_COLUMNS):
+    """Reduce interleaved samples to per-column (min, max) peaks.
+
+    All channels are folded into the same envelope. Returns two arrays of
+    length ``min(columns, frames)`` in the input dtype.
+    """
+    frames = samples[: len(samples) - len(samples) % channels].reshape(-1, channels)
+    if len(frames) == 0:
+        return np.zeros(0, dtype=samples.dtype), np.zeros(0, dtype=samples.dtype)
+    lows = frames.min(axis=1)
+    highs = frames.max(axis=1)
+
+    columns = min(columns, len(frames))
+    per_column = -(-len(frames) // columns)
+    pad = per_column * columns - len(frames)
+    if pad:
+        # Repeat the last frame so padding never widens the envelope
+        lows = np.pad(lows, (0, pad), mode="edge")
+        highs = np.pad(highs, (0, pad), mode="edge")
+    return lows.reshape(columns, per_column).min(axis=1), highs.reshape(columns, per_column).max(axis=1)
+
+
+def render_svg(lows, highs, duration, height=120):
+    """Lightweight inline SVG of the envelope; no matplotlib involved"""
+    columns = len(lows)
+    x = np.arange(columns, dtype=np.float32)
+    # Map amplitude [-1, 1] to y [height, 0]
+    top = (1 - highs) * height / 2
+    bottom = (1 - lows) * height / 2
+    xs = np.concatenate([x, x[::-1]])
+    ys = np.concatenate([top, bottom[::-1]])
+    points = " ".join(f"{px:.0f},{py:.1f}" for px, py in zip(xs.tolist(), ys.tolist()))
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {max(columns, 1)} {height}" '
+        f'preserveAspectRatio="none" width="100%" height="{height}" '
+        f'style="background:#1f2937;border-radius:0.5rem">'
+        f'<line x1="0" y1="{height / 2}" x2="{columns}" y2="{height / 2}" stroke="#374151" stroke-width="1"/>'
+        f'<polygon points="{points}" fill="#3b82f6" fill-opacity="0.6" stroke="#3b82f6" stroke-width="0.5"/>'
+        f"<title>{duration:.1f}s</title></svg>"
+    )
+
+
+def render_png(lows, highs, duration):
+    """PNG of the envelope drawn with matplotlib in the app's dark theme"""
+    # Imported lazily: the SVG path never needs matplotlib
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 2), facecolor='#0e1117')
+    try:
+        ax.set_facecolor('#1f2937')
+        time_axis = np.linspace(0, duration, len(lows))
+        ax.fill_between(time_axis, lows, highs, color='#3b82f6', alpha=0.8, linewidth=0.5)
+
+        ax.set_xlabel('Time (s)', color='#9ca3af')
+        ax.set_ylabel('Amplitude', color='#9ca3af')
+        ax.tick_params(colors='#9ca3af')
+        ax.grid(True, alpha=0.2, color='#374151')
+        fig.tight_layout()
+
+        buffer = BytesIO()
+        fig.savefig(buffer, format="png", facecolor=fig.get_facecolor())
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+
+def render_waveform(segment, fmt="svg", columns=DEFAULT_COLUMNS):
+    """Render a pydub segment as an SVG string or PNG bytes"""
+    # Reduce on the raw integers first; only the few peaks get converted to float
+    lows, highs = peak_envelope(segment_samples(segment), segment.channels, columns)
+    lows = normalize_peaks(lows, segment.sample_width)
+    highs = normalize_peaks(highs, segment.sample_width)
+    if fmt == "png":
+        return render_png(lows, highs, segment.duration_seconds)
+    return render_svg(lows, highs, segment.duration_seconds)